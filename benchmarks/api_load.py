@@ -0,0 +1,202 @@
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+
+import httpx
+
+from benchmarks.common import SEED_PASSWORD, reset_database, summarize, timed
+from fastapi_zero.app import app
+
+LATENCY_KEYS = ('p50_ms', 'p95_ms', 'p99_ms')
+
+
+class Recorder:
+    def __init__(self):
+        self.samples = {}
+        self.statuses = {}
+
+    async def request(self, name, awaitable):
+        response = await timed(self.samples.setdefault(name, []), awaitable)
+        statuses = self.statuses.setdefault(name, {})
+        statuses[response.status_code] = (
+            statuses.get(response.status_code, 0) + 1
+        )
+
+        return response
+
+    def report(self, elapsed):
+        return {
+            name: {
+                **summarize(samples),
+                'throughput_rps': round(len(samples) / elapsed, 1),
+                'statuses': self.statuses[name],
+            }
+            for name, samples in sorted(self.samples.items())
+        }
+
+
+async def login(client, recorder, email):
+    response = await recorder.request(
+        'POST /auth/token',
+        client.post(
+            '/auth/token', data={'username': email, 'password': SEED_PASSWORD}
+        ),
+    )
+
+    return {'Authorization': f'Bearer {response.json()["access_token"]}'}
+
+
+async def virtual_user(client, recorder, rng, headers, rounds):
+    for round_number in range(rounds):
+        await recorder.request(
+            'GET /todos/',
+            client.get('/todos/', params={'limit': 20}, headers=headers),
+        )
+        await recorder.request(
+            'GET /todos/?state',
+            client.get(
+                '/todos/',
+                params={'state': rng.choice(['todo', 'done']), 'limit': 20},
+                headers=headers,
+            ),
+        )
+        created = await recorder.request(
+            'POST /todos/',
+            client.post(
+                '/todos/',
+                json={
+                    'title': f'load {round_number}',
+                    'description': 'created by the load test',
+                    'state': 'todo',
+                },
+                headers=headers,
+            ),
+        )
+        todo_id = created.json()['id']
+        await recorder.request(
+            'PATCH /todos/{todo_id}',
+            client.patch(
+                f'/todos/{todo_id}', json={'state': 'done'}, headers=headers
+            ),
+        )
+        await recorder.request(
+            'DELETE /todos/{todo_id}',
+            client.delete(f'/todos/{todo_id}', headers=headers),
+        )
+
+
+def compare(report, baseline, tolerance):
+    comparison = {}
+
+    for name, current in report.items():
+        previous = baseline.get(name)
+        if not previous:
+            continue
+
+        ratios = {
+            key.replace('_ms', '_ratio'): round(
+                current[key] / previous[key], 3
+            )
+            for key in LATENCY_KEYS
+            if previous.get(key)
+        }
+        comparison[name] = {
+            **ratios,
+            'regressed': any(
+                ratio > 1 + tolerance for ratio in ratios.values()
+            ),
+        }
+
+    return comparison
+
+
+async def main(args):
+    async with app.router.lifespan_context(app):
+        if args.reset:
+            await reset_database(app.state.engine, args.users, args.todos)
+
+        transport = httpx.ASGITransport(app=app)
+        logins, flows = Recorder(), Recorder()
+        rng = random.Random(args.seed)
+        emails = [
+            f'bench{rng.randint(1, args.users)}@bench.com'
+            for _ in range(args.concurrency)
+        ]
+
+        async with httpx.AsyncClient(
+            transport=transport, base_url='http://bench'
+        ) as client:
+            start = time.perf_counter()
+            headers = await asyncio.gather(*[
+                login(client, logins, email) for email in emails
+            ])
+            login_elapsed = time.perf_counter() - start
+
+            start = time.perf_counter()
+            await asyncio.gather(*[
+                virtual_user(
+                    client,
+                    flows,
+                    random.Random(rng.random()),
+                    user_headers,
+                    args.rounds,
+                )
+                for user_headers in headers
+            ])
+            flow_elapsed = time.perf_counter() - start
+
+    report = {**logins.report(login_elapsed), **flows.report(flow_elapsed)}
+    output = {
+        'concurrency': args.concurrency,
+        'rounds': args.rounds,
+        'elapsed_s': round(login_elapsed + flow_elapsed, 3),
+        'endpoints': report,
+    }
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as baseline:
+            stored = json.load(baseline)['endpoints']
+        output['comparison'] = compare(report, stored, args.tolerance)
+
+    if args.save_baseline:
+        with open(args.save_baseline, 'w', encoding='utf-8') as baseline:
+            json.dump(output, baseline, indent=2)
+
+    print(json.dumps(output, indent=2))
+
+    regressed = [
+        name
+        for name, result in output.get('comparison', {}).items()
+        if result['regressed']
+    ]
+    if regressed:
+        sys.exit(f'regressed against the baseline: {", ".join(regressed)}')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description=(
+            'Drive login, list, filter, create, patch and delete flows '
+            'through the ASGI app and report latency per endpoint. '
+            '--reset DROPS and reseeds the tables in DATABASE_URL.'
+        )
+    )
+    parser.add_argument('--users', type=int, default=2000)
+    parser.add_argument('--todos', type=int, default=1_000_000)
+    parser.add_argument('--concurrency', type=int, default=20)
+    parser.add_argument('--rounds', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--reset', action='store_true')
+    parser.add_argument('--baseline', help='compare against this report')
+    parser.add_argument('--save-baseline', help='write the report here')
+    parser.add_argument(
+        '--tolerance',
+        type=float,
+        default=0.2,
+        help='allowed latency increase over the baseline (0.2 = 20%%)',
+    )
+
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,63 @@
+import time
+
+from sqlalchemy import text
+
+from fastapi_zero.models import table_registry
+from fastapi_zero.security import get_password_hash
+
+SEED_PASSWORD = 'benchbench'
+
+SEED_USERS = text("""
+    INSERT INTO users (username, email, password)
+    SELECT 'bench' || g, 'bench' || g || '@bench.com', :password
+    FROM generate_series(1, :users) AS g
+""")
+
+SEED_TODOS = text("""
+    INSERT INTO todos (title, description, state, user_id)
+    SELECT
+        'todo ' || g,
+        'description ' || g,
+        (ARRAY['draft', 'todo', 'doing', 'done', 'trash'])[1 + g % 5]
+            ::todostate,
+        1 + g % :users
+    FROM generate_series(1, :todos) AS g
+""")
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = max(0, round(pct / 100 * len(ordered)) - 1)
+    return ordered[index]
+
+
+def summarize(samples):
+    return {
+        'count': len(samples),
+        'p50_ms': round(percentile(samples, 50) * 1000, 3),
+        'p95_ms': round(percentile(samples, 95) * 1000, 3),
+        'p99_ms': round(percentile(samples, 99) * 1000, 3),
+    }
+
+
+async def timed(samples, awaitable):
+    start = time.perf_counter()
+    result = await awaitable
+    samples.append(time.perf_counter() - start)
+
+    return result
+
+
+async def reset_database(engine, users, todos):
+    async with engine.begin() as conn:
+        await conn.run_sync(table_registry.metadata.drop_all)
+        await conn.run_sync(table_registry.metadata.create_all)
+        await conn.execute(
+            SEED_USERS,
+            {'users': users, 'password': get_password_hash(SEED_PASSWORD)},
+        )
+        await conn.execute(SEED_TODOS, {'users': users, 'todos': todos})
+
+    async with engine.connect() as conn:
+        await conn.execution_options(isolation_level='AUTOCOMMIT')
+        await conn.execute(text('ANALYZE'))
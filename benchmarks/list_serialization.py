@@ -0,0 +1,111 @@
+import argparse
+import asyncio
+import json
+import time
+
+import httpx
+from fastapi.responses import JSONResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from benchmarks.common import reset_database, summarize, timed
+from fastapi_zero.app import app
+from fastapi_zero.database import build_engine
+from fastapi_zero.models import Todo
+from fastapi_zero.responses import FastJSONResponse, fetch_public_rows
+from fastapi_zero.routers import todos as todos_router
+from fastapi_zero.schemas import TodoList, TodoPublic
+from fastapi_zero.security import create_access_token
+from fastapi_zero.settings import get_settings
+
+engine = build_engine(get_settings())
+
+
+def default_render(todos):
+    # what FastAPI does for a response_model: validate, dump, json.dumps
+    content = TodoList.model_validate(
+        {'todos': todos}, from_attributes=True
+    ).model_dump(mode='json')
+    return JSONResponse(content).body
+
+
+def fast_render(rows):
+    return FastJSONResponse({'todos': [row._asdict() for row in rows]}).body
+
+
+async def serialization_only(limit, repeat):
+    query = select(Todo).where(Todo.user_id == 1).order_by(Todo.id)
+
+    async with AsyncSession(engine) as session:
+        todos = (await session.scalars(query.limit(limit))).all()
+        rows = await fetch_public_rows(
+            session, query.limit(limit), Todo, TodoPublic
+        )
+
+    report = {}
+    for name, render, data in (
+        ('default', default_render, todos),
+        ('fast', fast_render, rows),
+    ):
+        samples = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            render(data)
+            samples.append(time.perf_counter() - start)
+        report[name] = summarize(samples)
+
+    return report
+
+
+async def end_to_end(limit, repeat):
+    token = create_access_token({'sub': 'bench1@bench.com'})
+    headers = {'Authorization': f'Bearer {token}'}
+    app.state.engine = engine
+    transport = httpx.ASGITransport(app=app)
+    report = {}
+
+    async with httpx.AsyncClient(
+        transport=transport, base_url='http://bench'
+    ) as client:
+        for name, fast in (('default', False), ('fast', True)):
+            todos_router.settings.FAST_LIST_RESPONSES = fast
+            samples = []
+
+            for _ in range(repeat):
+                response = await timed(
+                    samples,
+                    client.get(f'/todos/?limit={limit}', headers=headers),
+                )
+                response.raise_for_status()
+
+            report[name] = summarize(samples)
+
+    return report
+
+
+async def main(limit, repeat, reset):
+    if reset:
+        await reset_database(engine, users=10, todos=10 * limit * 10)
+
+    report = {
+        'serialization_only': await serialization_only(limit, repeat),
+        'GET /todos/': await end_to_end(limit, repeat),
+    }
+
+    await engine.dispose()
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description=(
+            'Compare the default and FAST_LIST_RESPONSES list paths. '
+            '--reset DROPS and reseeds the tables in DATABASE_URL.'
+        )
+    )
+    parser.add_argument('--limit', type=int, default=100)
+    parser.add_argument('--repeat', type=int, default=500)
+    parser.add_argument('--reset', action='store_true')
+    args = parser.parse_args()
+
+    asyncio.run(main(args.limit, args.repeat, args.reset))
@@ -0,0 +1,106 @@
+import argparse
+import asyncio
+import json
+import time
+from http import HTTPStatus
+
+import httpx
+
+from benchmarks.common import summarize
+from fastapi_zero.app import app
+from fastapi_zero.database import build_engine
+from fastapi_zero.models import table_registry
+from fastapi_zero.settings import get_settings
+
+EMAIL = 'bench-login@bench.com'
+PASSWORD = 'benchbench'
+
+engine = build_engine(get_settings())
+
+
+async def setup(client):
+    async with engine.begin() as conn:
+        await conn.run_sync(table_registry.metadata.create_all)
+
+    await client.post(
+        '/users/',
+        json={'username': 'bench-login', 'email': EMAIL, 'password': PASSWORD},
+    )
+    response = await client.post(
+        '/auth/token', data={'username': EMAIL, 'password': PASSWORD}
+    )
+
+    return {'Authorization': f'Bearer {response.json()["access_token"]}'}
+
+
+async def poll_todos(client, headers, stop):
+    samples = []
+
+    while not stop.is_set():
+        start = time.perf_counter()
+        await client.get('/todos/', headers=headers)
+        samples.append(time.perf_counter() - start)
+
+    return samples
+
+
+async def login(client, count, statuses):
+    for _ in range(count):
+        response = await client.post(
+            '/auth/token', data={'username': EMAIL, 'password': PASSWORD}
+        )
+        statuses[response.status_code] = (
+            statuses.get(response.status_code, 0) + 1
+        )
+
+
+async def run_phase(client, headers, logins, concurrency):
+    stop = asyncio.Event()
+    statuses = {}
+    poller = asyncio.create_task(poll_todos(client, headers, stop))
+
+    if logins:
+        await asyncio.gather(*[
+            login(client, logins // concurrency, statuses)
+            for _ in range(concurrency)
+        ])
+    else:
+        await asyncio.sleep(1)
+
+    stop.set()
+    samples = await poller
+
+    return {**summarize(samples), 'login_statuses': statuses}
+
+
+async def main(logins, concurrency):
+    app.state.engine = engine
+    transport = httpx.ASGITransport(app=app)
+
+    async with httpx.AsyncClient(
+        transport=transport, base_url='http://bench'
+    ) as client:
+        headers = await setup(client)
+        report = {
+            'idle': await run_phase(client, headers, 0, concurrency),
+            'login_burst': await run_phase(
+                client, headers, logins, concurrency
+            ),
+        }
+
+    await engine.dispose()
+    print(json.dumps({'GET /todos/': report}, indent=2))
+
+    if report['login_burst']['login_statuses'].get(HTTPStatus.OK) is None:
+        raise SystemExit('no login succeeded during the burst')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='p50/p95/p99 of GET /todos/ while logins are running'
+    )
+    parser.add_argument('--logins', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=20)
+    args = parser.parse_args()
+
+    asyncio.run(main(args.logins, args.concurrency))
@@ -0,0 +1,131 @@
+import argparse
+import asyncio
+import json
+from datetime import datetime
+
+from sqlalchemy import delete, select, tuple_, update
+
+from benchmarks.common import reset_database, summarize, timed
+from fastapi_zero.database import build_engine
+from fastapi_zero.models import Todo, TodoState
+from fastapi_zero.settings import get_settings
+
+engine = build_engine(get_settings())
+
+
+def access_paths(user_id, todo_id):
+    return {
+        'list_todos': select(Todo)
+        .where(Todo.user_id == user_id, Todo.state == TodoState.doing)
+        .order_by(Todo.id)
+        .limit(10),
+        'todo_changes': select(Todo)
+        .where(
+            Todo.user_id == user_id,
+            tuple_(Todo.updated_at, Todo.id) > (datetime(2000, 1, 1), 0),
+        )
+        .order_by(Todo.updated_at, Todo.id)
+        .limit(101),
+        'patch_todo': update(Todo)
+        .where(Todo.user_id == user_id, Todo.id == todo_id)
+        .values(title='patched'),
+        'delete_todo': delete(Todo).where(
+            Todo.user_id == user_id, Todo.id == todo_id
+        ),
+    }
+
+
+def scan_nodes(plan):
+    children = plan.get('Plans', [])
+
+    if not children:
+        index_name = plan.get('Index Name')
+        node = plan['Node Type']
+        return [f'{node} using {index_name}' if index_name else node]
+
+    return [node for child in children for node in scan_nodes(child)]
+
+
+async def explain(conn, statement):
+    compiled = statement.compile(
+        conn.sync_connection, compile_kwargs={'literal_binds': True}
+    )
+    plan = await conn.exec_driver_sql(
+        f'EXPLAIN (ANALYZE, FORMAT JSON) {compiled}'
+    )
+    plan = plan.scalar()[0]
+
+    return {
+        'scans': scan_nodes(plan['Plan']),
+        'execution_ms': plan['Execution Time'],
+    }
+
+
+async def measure(repeat, user_id, todo_id):
+    report = {}
+
+    for name, statement in access_paths(user_id, todo_id).items():
+        samples = []
+
+        for _ in range(repeat):
+            async with engine.connect() as conn:
+                await timed(samples, conn.execute(statement))
+                await conn.rollback()
+
+        async with engine.connect() as conn:
+            plan = await explain(conn, statement)
+            await conn.rollback()
+
+        report[name] = {**summarize(samples), 'plan': plan}
+
+    return report
+
+
+async def toggle_indexes(enabled):
+    async with engine.begin() as conn:
+        for index in Todo.__table__.indexes:
+            if enabled:
+                await conn.run_sync(index.create, checkfirst=True)
+            else:
+                await conn.run_sync(index.drop, checkfirst=True)
+
+
+async def main(users, todos, repeat, reset):
+    if reset:
+        await reset_database(engine, users, todos)
+
+    async with engine.connect() as conn:
+        todo_id = await conn.scalar(select(Todo.id).order_by(Todo.id.desc()))
+        user_id = await conn.scalar(
+            select(Todo.user_id).where(Todo.id == todo_id)
+        )
+
+    await toggle_indexes(enabled=False)
+    without_indexes = await measure(repeat, user_id, todo_id)
+    await toggle_indexes(enabled=True)
+    with_indexes = await measure(repeat, user_id, todo_id)
+
+    await engine.dispose()
+    print(
+        json.dumps(
+            {'without_indexes': without_indexes, 'with_indexes': with_indexes},
+            indent=2,
+        )
+    )
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description=(
+            'Query plans and latency of the todo access paths with and '
+            'without the composite indexes. --reset DROPS and reseeds the '
+            'tables in DATABASE_URL.'
+        )
+    )
+    parser.add_argument('--users', type=int, default=1_000)
+    parser.add_argument('--todos', type=int, default=2_000_000)
+    parser.add_argument('--repeat', type=int, default=50)
+    parser.add_argument('--reset', action='store_true')
+    args = parser.parse_args()
+
+    asyncio.run(main(args.users, args.todos, args.repeat, args.reset))
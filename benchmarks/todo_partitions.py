@@ -0,0 +1,61 @@
+import argparse
+import asyncio
+import json
+
+from sqlalchemy import select
+
+from benchmarks.common import reset_database
+from benchmarks.todo_indexes import engine, measure
+from fastapi_zero.models import Todo
+from fastapi_zero.partitioning import rebuild_todos
+
+
+async def set_layout(partitions):
+    async with engine.begin() as conn:
+        await conn.run_sync(rebuild_todos, partitions)
+
+    async with engine.connect() as conn:
+        await conn.execution_options(isolation_level='AUTOCOMMIT')
+        await conn.exec_driver_sql('VACUUM ANALYZE todos')
+
+
+async def main(users, todos, partitions, repeat, reset):
+    if reset:
+        await reset_database(engine, users, todos)
+
+    async with engine.connect() as conn:
+        todo_id = await conn.scalar(select(Todo.id).order_by(Todo.id.desc()))
+        user_id = await conn.scalar(
+            select(Todo.user_id).where(Todo.id == todo_id)
+        )
+
+    report = {}
+    for layout in (0, partitions):
+        await set_layout(layout)
+        report[f'partitions_{layout}'] = await measure(
+            repeat, user_id, todo_id
+        )
+
+    await set_layout(0)
+    await engine.dispose()
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description=(
+            'Query plans and latency of the todo access paths on the plain '
+            'and the hash-partitioned layout with the same rows. --reset '
+            'DROPS and reseeds the tables in DATABASE_URL.'
+        )
+    )
+    parser.add_argument('--users', type=int, default=1_000)
+    parser.add_argument('--todos', type=int, default=2_000_000)
+    parser.add_argument('--partitions', type=int, default=16)
+    parser.add_argument('--repeat', type=int, default=50)
+    parser.add_argument('--reset', action='store_true')
+    args = parser.parse_args()
+
+    asyncio.run(
+        main(args.users, args.todos, args.partitions, args.repeat, args.reset)
+    )
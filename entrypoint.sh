@@ -1,7 +1,7 @@
 #!/bin/sh
 
 # Executa as migrações do banco de dados
-poetry run alembic upgrade head
+alembic upgrade head
 
-# Inicia a aplicação
-poetry run uvicorn --host 0.0.0.0 --port 8000 fastapi_zero.app:app
\ No newline at end of file
+# Inicia a aplicação (exec para receber o SIGTERM e drenar as conexões)
+exec python -m fastapi_zero.server
@@ -1,14 +1,82 @@
+from contextlib import asynccontextmanager
 from http import HTTPStatus
 
-from fastapi import FastAPI
-from fastapi.responses import HTMLResponse
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import HTMLResponse, PlainTextResponse
 
+from fastapi_zero import metrics, querytrace
+from fastapi_zero.changefeed import build_change_bus, close_on_shutdown
+from fastapi_zero.database import (
+    build_engine,
+    pool_metrics,
+    pool_statistics,
+    warm_up_pool,
+)
 from fastapi_zero.routers import auth, todos, users
 from fastapi_zero.schemas import (
     Message,
+    PoolStatistics,
 )
+from fastapi_zero.security import principal_cache, token_version_cache
+from fastapi_zero.settings import get_settings
+
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def collect_runtime_metrics():
+    for name, cache in (
+        ('principal', principal_cache),
+        ('token_version', token_version_cache),
+    ):
+        metrics.cache_requests.set(name, 'hit', value=cache.hits)
+        metrics.cache_requests.set(name, 'miss', value=cache.misses)
+
+    metrics.db_pool_checkouts.set(value=pool_metrics.checkouts)
+    metrics.db_pool_timeouts.set(value=pool_metrics.timeouts)
+    metrics.db_pool_wait.set(value=pool_metrics.wait_seconds_total)
+
+
+metrics.registry.collectors.append(collect_runtime_metrics)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    settings = get_settings()
+    app.state.engine = build_engine(settings)
+    app.state.replica_engines = [
+        build_engine(settings, url) for url in settings.DATABASE_REPLICA_URLS
+    ]
+
+    for engine in (app.state.engine, *app.state.replica_engines):
+        if settings.METRICS_ENABLED:
+            metrics.instrument_engine(engine)
+
+        if settings.QUERY_TRACE_ENABLED:
+            querytrace.instrument_engine(engine)
+
+    for engine in (app.state.engine, *app.state.replica_engines):
+        await warm_up_pool(engine, settings.DATABASE_POOL_WARMUP)
+
+    app.state.change_bus = build_change_bus(app.state.engine, settings)
 
-app = FastAPI(title='FastAPI Zero')
+    with close_on_shutdown(app.state.change_bus):
+        yield
+
+    await app.state.change_bus.close()
+
+    for engine in (app.state.engine, *app.state.replica_engines):
+        await engine.dispose()
+
+
+app = FastAPI(title='FastAPI Zero', lifespan=lifespan)
+
+if get_settings().QUERY_TRACE_ENABLED:
+    app.add_middleware(
+        querytrace.QueryTraceMiddleware, settings=get_settings()
+    )
+
+if get_settings().METRICS_ENABLED:
+    app.add_middleware(metrics.MetricsMiddleware)
 
 app.include_router(auth.router)
 app.include_router(users.router)
@@ -20,6 +88,29 @@ def read_root():
     return {'message': 'Olá Mundo!'}
 
 
+@app.get(
+    '/health/pool', status_code=HTTPStatus.OK, response_model=PoolStatistics
+)
+def read_pool_statistics(request: Request):
+    return pool_statistics(request.app.state.engine)
+
+
+@app.get(
+    '/metrics',
+    status_code=HTTPStatus.OK,
+    response_class=PlainTextResponse,
+    include_in_schema=False,
+)
+def read_metrics():
+    # the middleware is not installed, so there is nothing to report
+    if not get_settings().METRICS_ENABLED:
+        raise HTTPException(status_code=HTTPStatus.NOT_FOUND)
+
+    return PlainTextResponse(
+        metrics.registry.render(), media_type=PROMETHEUS_CONTENT_TYPE
+    )
+
+
 @app.get('/home/', status_code=HTTPStatus.OK, response_class=HTMLResponse)
 def read_root_html():
     return """<html>
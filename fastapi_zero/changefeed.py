@@ -0,0 +1,237 @@
+import asyncio
+import json
+import logging
+import signal
+import threading
+from contextlib import asynccontextmanager, contextmanager, suppress
+from time import monotonic
+
+from fastapi import Request
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    create_async_engine,
+)
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import NullPool
+
+from fastapi_zero.settings import Settings
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = 'todo_changes'
+RESYNC = {'op': 'resync'}
+CLOSED = None
+SHUTDOWN_SIGNALS = (signal.SIGINT, signal.SIGTERM)
+KEEPALIVE = object()
+# as in the todos triggers, larger writes send one resync instead
+BULK_CHANGE_LIMIT = 100
+
+
+def _offer(queue: asyncio.Queue, change):
+    try:
+        queue.put_nowait(change)
+    except asyncio.QueueFull:
+        # a subscriber that fell behind gets a single resync instead
+        while not queue.empty():
+            queue.get_nowait()
+        queue.put_nowait(CLOSED if change is CLOSED else RESYNC)
+
+
+class ChangeBus:
+    def __init__(self, queue_size: int):
+        self.queue_size = queue_size
+        self.subscribers = {}
+
+    @asynccontextmanager
+    async def subscribe(self, user_id: int):
+        queue = asyncio.Queue(self.queue_size)
+        self.subscribers.setdefault(user_id, set()).add(queue)
+
+        try:
+            await self.ready()
+            yield queue
+        finally:
+            queues = self.subscribers[user_id]
+            queues.discard(queue)
+            if not queues:
+                del self.subscribers[user_id]
+
+    async def ready(self):
+        pass
+
+    async def publish(self, session: AsyncSession, change: dict):
+        session.info.setdefault('todo_changes', []).append((self, change))
+
+    async def publish_many(
+        self, session: AsyncSession, user_id: int, op: str, ids
+    ):
+        if len(ids) > BULK_CHANGE_LIMIT:
+            await self.publish(session, {'user_id': user_id, **RESYNC})
+            return
+
+        for todo_id in sorted(ids):
+            await self.publish(
+                session, {'user_id': user_id, 'op': op, 'id': todo_id}
+            )
+
+    def dispatch(self, change: dict):
+        for queue in self.subscribers.get(change['user_id'], ()):
+            _offer(queue, change)
+
+    def broadcast(self, change):
+        for queues in self.subscribers.values():
+            for queue in queues:
+                _offer(queue, change)
+
+    async def close(self):
+        self.broadcast(CLOSED)
+
+
+class PostgresChangeBus(ChangeBus):
+    def __init__(self, engine: AsyncEngine, queue_size: int):
+        super().__init__(queue_size)
+        # one connection outside the pool serves every stream of the worker
+        self.engine = create_async_engine(
+            engine.url, poolclass=NullPool, isolation_level='AUTOCOMMIT'
+        )
+        self.listening = asyncio.Event()
+        self.listener = None
+
+    async def ready(self):
+        if self.listener is None or self.listener.done():
+            self.listening.clear()
+            self.listener = asyncio.create_task(
+                self.listen(missed=self.listener is not None)
+            )
+
+        await self.listening.wait()
+
+    # the todos triggers NOTIFY in the writing statement itself
+    async def publish(self, session: AsyncSession, change: dict):
+        pass
+
+    async def relay(self, missed: bool):
+        async with self.engine.connect() as connection:
+            await connection.exec_driver_sql(f'LISTEN {CHANNEL}')
+            raw_connection = await connection.get_raw_connection()
+            self.listening.set()
+
+            # notifications sent while reconnecting are gone
+            if missed:
+                self.broadcast(RESYNC)
+
+            notifies = raw_connection.driver_connection.notifies()
+            async for notify in notifies:
+                try:
+                    self.dispatch(json.loads(notify.payload))
+                except Exception:
+                    logger.exception(
+                        'Ignoring change notification %r', notify.payload
+                    )
+
+    async def listen(self, missed: bool):
+        while True:
+            try:
+                await self.relay(missed)
+            except Exception:
+                logger.exception('Change feed listener lost, reconnecting')
+
+            self.listening.clear()
+            missed = True
+            await asyncio.sleep(1)
+
+    async def close(self):
+        if self.listener is not None:
+            self.listener.cancel()
+            with suppress(asyncio.CancelledError):
+                await self.listener
+
+        await self.engine.dispose()
+        await super().close()
+
+
+@event.listens_for(Session, 'after_commit')
+def _dispatch_changes(session):
+    for bus, change in session.info.pop('todo_changes', ()):
+        bus.dispatch(change)
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _discard_changes(session, previous_transaction):
+    session.info.pop('todo_changes', None)
+
+
+def build_change_bus(engine: AsyncEngine, settings: Settings):
+    if engine.dialect.name == 'postgresql':
+        return PostgresChangeBus(engine, settings.TODO_STREAM_QUEUE_SIZE)
+
+    return ChangeBus(settings.TODO_STREAM_QUEUE_SIZE)
+
+
+@contextmanager
+def close_on_shutdown(bus: ChangeBus):
+    # signals can only be handled in the main thread
+    if threading.current_thread() is not threading.main_thread():
+        yield
+        return
+
+    loop = asyncio.get_running_loop()
+    previous_handlers = {}
+
+    # the server keeps the lifespan open until streams end, so close them
+    # as soon as it is asked to stop, then let its own handler run
+    def handle_shutdown(signum, frame):
+        loop.call_soon_threadsafe(bus.broadcast, CLOSED)
+        previous = previous_handlers[signum]
+        if callable(previous):
+            previous(signum, frame)
+        else:
+            signal.signal(signum, previous)
+            signal.raise_signal(signum)
+
+    for signum in SHUTDOWN_SIGNALS:
+        previous_handlers[signum] = signal.signal(signum, handle_shutdown)
+
+    try:
+        yield
+    finally:
+        for signum, previous in previous_handlers.items():
+            signal.signal(signum, previous)
+
+
+def get_change_bus(request: Request):  # pragma: no cover
+    return request.app.state.change_bus
+
+
+async def stream_changes(
+    bus: ChangeBus, user_id: int, keepalive: float, authorized=None
+):
+    async with bus.subscribe(user_id) as queue:
+        yield ': subscribed\n\n'
+        authorized_until = monotonic() + keepalive
+
+        while True:
+            try:
+                change = await asyncio.wait_for(queue.get(), keepalive)
+            except TimeoutError:
+                change = KEEPALIVE
+
+            if change is CLOSED:
+                return
+
+            # a revoked token or deleted account ends the stream
+            if authorized is not None and monotonic() >= authorized_until:
+                if not await authorized():
+                    return
+                authorized_until = monotonic() + keepalive
+
+            if change is KEEPALIVE:
+                yield ': keepalive\n\n'
+                continue
+
+            data = {
+                key: value for key, value in change.items() if key != 'user_id'
+            }
+            yield f'event: todo\ndata: {json.dumps(data)}\n\n'
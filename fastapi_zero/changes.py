@@ -0,0 +1,117 @@
+import argparse
+import asyncio
+from datetime import timedelta
+from math import ceil
+
+from sqlalchemy import delete, func, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from fastapi_zero.database import build_engine
+from fastapi_zero.models import Todo, TodoTombstone
+from fastapi_zero.pagination import decode_watermark, encode_watermark
+from fastapi_zero.settings import get_settings
+
+
+# change timestamps are now() in the session TimeZone, so cutoffs are too
+def database_cutoff(age: timedelta):
+    return func.localtimestamp() - age
+
+
+def tombstone_horizon(retention_days: int):
+    return database_cutoff(timedelta(days=retention_days))
+
+
+async def read_todo_changes(  # noqa: PLR0913, PLR0917
+    session: AsyncSession,
+    user_id: int,
+    since: str | None,
+    limit: int,
+    settle_seconds: float,
+):
+    todos = select(Todo).where(Todo.user_id == user_id)
+    tombstones = select(TodoTombstone).where(TodoTombstone.user_id == user_id)
+
+    if since:
+        watermark = decode_watermark(since)
+        todos = todos.where(tuple_(Todo.updated_at, Todo.id) > watermark)
+        tombstones = tombstones.where(
+            tuple_(TodoTombstone.deleted_at, TodoTombstone.id) > watermark
+        )
+
+    # each side is read in index order, so limit + 1 rows of each are
+    # enough to fill the page and tell whether more changes are waiting
+    todos = await session.scalars(
+        todos.order_by(Todo.updated_at, Todo.id).limit(limit + 1)
+    )
+    tombstones = await session.scalars(
+        tombstones.order_by(TodoTombstone.deleted_at, TodoTombstone.id).limit(
+            limit + 1
+        )
+    )
+    changes = sorted(
+        [
+            *((todo.updated_at, todo.id, todo) for todo in todos),
+            *(
+                (tombstone.deleted_at, tombstone.id, tombstone)
+                for tombstone in tombstones
+            ),
+        ],
+        key=lambda change: change[:2],
+    )
+    page = changes[:limit]
+
+    # changes are stamped with their transaction's start, so one committing
+    # late can sort behind a watermark already handed out: recent changes
+    # are sent again on every sync until they are older than the margin,
+    # and retry_after says when the oldest of them settles
+    settled_at = await session.scalar(
+        select(database_cutoff(timedelta(seconds=settle_seconds)))
+    )
+    settled = [change for change in page if change[0] <= settled_at]
+    retry_after = None
+
+    if len(settled) < len(page):
+        unsettled_at = page[len(settled)][0]
+        retry_after = ceil((unsettled_at - settled_at).total_seconds())
+
+    return {
+        'todos': [row for *_, row in page if isinstance(row, Todo)],
+        'deleted': [row for *_, row in page if isinstance(row, TodoTombstone)],
+        'watermark': encode_watermark(*settled[-1][:2]) if settled else since,
+        'has_more': len(changes) > limit,
+        'retry_after': retry_after,
+    }
+
+
+async def prune_todo_tombstones(session: AsyncSession, retention_days: int):
+    result = await session.execute(
+        delete(TodoTombstone).where(
+            TodoTombstone.deleted_at < tombstone_horizon(retention_days)
+        )
+    )
+    await session.commit()
+
+    return result.rowcount
+
+
+async def main(retention_days: int):
+    engine = build_engine(get_settings())
+
+    async with AsyncSession(engine) as session:
+        await prune_todo_tombstones(session, retention_days)
+
+    await engine.dispose()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Drop todo tombstones older than the retention window.'
+    )
+    parser.add_argument(
+        '--retention-days',
+        type=int,
+        default=get_settings().TODO_TOMBSTONE_RETENTION_DAYS,
+    )
+    args = parser.parse_args()
+
+    asyncio.run(main(args.retention_days))
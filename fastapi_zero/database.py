@@ -1,10 +1,176 @@
+import asyncio
+import random
+from contextlib import AsyncExitStack
+from dataclasses import dataclass
+from datetime import timedelta
+from time import perf_counter
+
+from fastapi import Request
+from sqlalchemy import Delete, Insert, Update, exists, func, select
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool
+
+from fastapi_zero.models import TodoVersion, User
+from fastapi_zero.settings import Settings, get_settings
+
+READ_METHODS = {'GET', 'HEAD'}
+
+
+@dataclass
+class PoolMetrics:
+    checkouts: int = 0
+    timeouts: int = 0
+    wait_seconds_total: float = 0.0
+    wait_seconds_max: float = 0.0
+
+    def observe_wait(self, seconds: float):
+        self.checkouts += 1
+        self.wait_seconds_total += seconds
+        self.wait_seconds_max = max(self.wait_seconds_max, seconds)
+
+
+pool_metrics = PoolMetrics()
+
+
+class MeteredPool(AsyncAdaptedQueuePool):
+    def _do_get(self):
+        start = perf_counter()
+
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            pool_metrics.timeouts += 1
+            raise
+        finally:
+            pool_metrics.observe_wait(perf_counter() - start)
+
+
+def build_engine(settings: Settings, url: str | None = None):
+    url = url or settings.DATABASE_URL
+    connect_args = {}
+
+    if url.startswith('postgresql+psycopg'):
+        connect_args['prepare_threshold'] = settings.DATABASE_PREPARE_THRESHOLD
+
+        statement_timeout = settings.DATABASE_STATEMENT_TIMEOUT_MS
+        if statement_timeout:
+            connect_args['options'] = (
+                f'-c statement_timeout={statement_timeout}'
+            )
+
+    if settings.DATABASE_NULL_POOL:
+        return create_async_engine(
+            url,
+            poolclass=NullPool,
+            connect_args=connect_args,
+        )
+
+    return create_async_engine(
+        url,
+        poolclass=MeteredPool,
+        pool_size=settings.DATABASE_POOL_SIZE,
+        max_overflow=settings.DATABASE_MAX_OVERFLOW,
+        pool_timeout=settings.DATABASE_POOL_TIMEOUT,
+        pool_recycle=settings.DATABASE_POOL_RECYCLE,
+        pool_pre_ping=settings.DATABASE_POOL_PRE_PING,
+        connect_args=connect_args,
+    )
+
+
+def pool_statistics(engine):
+    pool = engine.pool
+    statistics = {
+        'pool_class': type(pool).__name__,
+        'checkouts': pool_metrics.checkouts,
+        'timeouts': pool_metrics.timeouts,
+        'wait_seconds_total': pool_metrics.wait_seconds_total,
+        'wait_seconds_max': pool_metrics.wait_seconds_max,
+    }
+
+    if isinstance(pool, AsyncAdaptedQueuePool):
+        statistics.update({
+            'size': pool.size(),
+            'checked_in': pool.checkedin(),
+            'checked_out': pool.checkedout(),
+            'overflow': max(pool.overflow(), 0),
+        })
+
+    return statistics
+
+
+async def warm_up_pool(engine, connections: int):
+    if connections <= 0 or isinstance(engine.pool, NullPool):
+        return
+
+    async with AsyncExitStack() as stack:
+        await asyncio.gather(
+            *(
+                stack.enter_async_context(engine.connect())
+                for _ in range(connections)
+            )
+        )
+
+
+class RoutingSession(Session):
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if (
+            bind is not None
+            or self.info.get('replica') is None
+            or not self.info.get('read_only')
+            or self._flushing
+            or isinstance(clause, (Insert, Update, Delete))
+        ):
+            return super().get_bind(mapper, clause=clause, bind=bind, **kwargs)
+
+        return self.info['replica'].sync_engine
+
+
+async def bind_user(session: AsyncSession, user_id: int):
+    if session.info.get('replica') is None or not session.info['read_only']:
+        return
+
+    # only the primary is sure to have seen the user's latest writes
+    since = func.localtimestamp() - timedelta(
+        seconds=get_settings().REPLICA_STICKINESS_SECONDS
+    )
+    wrote_recently = select(
+        exists().where(User.id == user_id, User.updated_at > since)
+        | exists().where(
+            TodoVersion.user_id == user_id, TodoVersion.changed_at > since
+        )
+    )
+
+    if await session.scalar(
+        wrote_recently, bind_arguments={'bind': session.sync_session.bind}
+    ):
+        session.info['read_only'] = False
+
+
+def read_engine(session: AsyncSession):
+    if session.info.get('replica') is None or not session.info['read_only']:
+        return session.bind
+
+    return session.info['replica']
 
-from fastapi_zero.settings import Settings
 
-engine = create_async_engine(Settings().DATABASE_URL)
+def open_session(engine, replicas=(), *, read_only=False):
+    return AsyncSession(
+        engine,
+        expire_on_commit=False,
+        sync_session_class=RoutingSession,
+        info={
+            'replica': random.choice(replicas) if replicas else None,
+            'read_only': read_only,
+        },
+    )
 
 
-async def get_session():  # pragma: no cover
-    async with AsyncSession(engine, expire_on_commit=False) as session:
+async def get_session(request: Request):
+    async with open_session(
+        request.app.state.engine,
+        request.app.state.replica_engines,
+        read_only=request.method in READ_METHODS,
+    ) as session:
         yield session
@@ -0,0 +1,32 @@
+from hashlib import blake2b
+from http import HTTPStatus
+
+from fastapi import Request, Response
+
+
+def weak_etag(*parts):
+    digest = blake2b(repr(parts).encode(), digest_size=16).hexdigest()
+    return f'W/"{digest}"'
+
+
+def etag_matches(request: Request, etag: str):
+    if_none_match = request.headers.get('if-none-match')
+
+    if not if_none_match:
+        return False
+
+    if if_none_match.strip() == '*':
+        return True
+
+    # weak comparison: W/"x" and "x" are the same entity tag
+    candidates = {
+        tag.strip().removeprefix('W/') for tag in if_none_match.split(',')
+    }
+
+    return etag.removeprefix('W/') in candidates
+
+
+def not_modified(etag: str):
+    return Response(
+        status_code=HTTPStatus.NOT_MODIFIED, headers={'ETag': etag}
+    )
@@ -0,0 +1,193 @@
+import codecs
+import csv
+import json
+from http import HTTPStatus
+
+from fastapi import HTTPException
+from pydantic import ValidationError
+from sqlalchemy import insert
+
+from fastapi_zero.models import Todo
+from fastapi_zero.schemas import TodoSchema
+
+COPY_COLUMNS = ('title', 'description', 'state', 'user_id')
+COPY_TODOS = f'COPY todos ({", ".join(COPY_COLUMNS)}) FROM STDIN'
+MAX_REPORTED_ERRORS = 100
+
+
+class _NeedMoreLines(Exception):
+    pass
+
+
+def _then_need_more(lines):
+    yield from lines
+    raise _NeedMoreLines
+
+
+def _too_large(max_size: int):
+    return ValueError(f'Record exceeds {max_size} characters')
+
+
+async def iter_lines(chunks, max_size: int):
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    pending = ''
+    skipping = False
+
+    async for chunk in chunks:
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split('\n')
+
+        if skipping and lines:
+            lines = lines[1:]
+            skipping = False
+
+        for line in lines:
+            if len(line) > max_size:
+                yield _too_large(max_size)
+            else:
+                yield f'{line}\n'
+
+        # never buffer more than one record's worth of a line
+        if len(pending) > max_size:
+            yield _too_large(max_size)
+            pending = ''
+            skipping = True
+
+    pending += decoder.decode(b'', final=True)
+    if pending and not skipping:
+        yield _too_large(max_size) if len(pending) > max_size else pending
+
+
+async def iter_records(chunks, csv_format: bool, max_size: int):
+    record = []
+    record_size = 0
+
+    async for line in iter_lines(chunks, max_size):
+        if isinstance(line, ValueError):
+            record, record_size = [], 0
+            yield line
+            continue
+
+        if not csv_format:
+            yield line.removesuffix('\n').removesuffix('\r')
+            continue
+
+        record.append(line)
+        record_size += len(line.removesuffix('\n'))
+
+        if record_size > max_size:
+            record, record_size = [], 0
+            yield _too_large(max_size)
+            continue
+
+        # csv.reader asks for another line while a quoted field is open
+        try:
+            yield next(csv.reader(_then_need_more(record)))
+        except _NeedMoreLines:
+            continue
+        except csv.Error as error:
+            yield ValueError(f'Invalid CSV: {error}')
+
+        record, record_size = [], 0
+
+    if record:
+        try:
+            yield next(csv.reader(record))
+        except csv.Error as error:
+            yield ValueError(f'Invalid CSV: {error}')
+
+
+def parse_record(record: str | list[str], fieldnames: list[str] | None):
+    if fieldnames is not None:
+        return dict(zip(fieldnames, record))
+
+    return json.loads(record)
+
+
+def describe_error(error: ValueError):
+    if isinstance(error, ValidationError):
+        return '; '.join(
+            f'{".".join(map(str, item["loc"]))}: {item["msg"]}'
+            for item in error.errors()
+        )
+
+    return str(error)
+
+
+async def copy_todos(session, rows: list[tuple]):
+    connection = await session.connection()
+
+    if connection.dialect.driver != 'psycopg':
+        await session.execute(
+            insert(Todo), [dict(zip(COPY_COLUMNS, row)) for row in rows]
+        )
+        return
+
+    raw_connection = await connection.get_raw_connection()
+
+    async with raw_connection.driver_connection.cursor() as cursor:
+        async with cursor.copy(COPY_TODOS) as copy:
+            for row in rows:
+                await copy.write_row(row)
+
+
+async def import_todos(  # noqa: PLR0913, PLR0917
+    session,
+    user_id: int,
+    chunks,
+    import_format: str,
+    batch_size: int,
+    max_record_size: int,
+):
+    csv_format = import_format == 'csv'
+    fieldnames = None
+    accepted = 0
+    errors = []
+    rejected = 0
+    batch = []
+
+    record_number = 0
+    async for record in iter_records(chunks, csv_format, max_record_size):
+        record_number += 1
+
+        if not isinstance(record, ValueError) and not ''.join(record).strip():
+            continue
+
+        if csv_format and fieldnames is None:
+            if isinstance(record, ValueError):
+                raise HTTPException(
+                    status_code=HTTPStatus.UNPROCESSABLE_ENTITY,
+                    detail=f'Invalid CSV header: {record}',
+                )
+
+            fieldnames = record
+            continue
+
+        try:
+            if isinstance(record, ValueError):
+                raise record
+
+            todo = TodoSchema.model_validate(parse_record(record, fieldnames))
+        except ValueError as error:
+            rejected += 1
+            if len(errors) < MAX_REPORTED_ERRORS:
+                errors.append({
+                    'record': record_number,
+                    'detail': describe_error(error),
+                })
+            continue
+
+        batch.append((todo.title, todo.description, todo.state.value, user_id))
+
+        if len(batch) >= batch_size:
+            await copy_todos(session, batch)
+            accepted += len(batch)
+            batch = []
+
+    if batch:
+        await copy_todos(session, batch)
+        accepted += len(batch)
+
+    await session.commit()
+
+    return {'accepted': accepted, 'rejected': rejected, 'errors': errors}
@@ -0,0 +1,267 @@
+from bisect import bisect_left
+from contextvars import ContextVar
+from threading import Lock
+from time import perf_counter
+
+from sqlalchemy import event
+
+DEFAULT_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)  # fmt: skip
+SQL_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5, 1.0)
+STATEMENT_BUCKETS = (0, 1, 2, 3, 5, 10, 25, 50, 100)
+
+
+def _escape(value):
+    return (
+        str(value)
+        .replace('\\', r'\\')
+        .replace('\n', r'\n')
+        .replace('"', r'\"')
+    )
+
+
+def _format_labels(names, values, extra=()):
+    pairs = [*zip(names, values), *extra]
+    if not pairs:
+        return ''
+
+    return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in pairs) + '}'
+
+
+class Metric:
+    kind = 'untyped'
+
+    def __init__(self, name: str, documentation: str, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = Lock()
+
+    def samples(self):
+        with self._lock:
+            values = dict(self._values)
+
+        for labels, value in sorted(values.items()):
+            yield self.name + _format_labels(self.labelnames, labels), value
+
+    def render(self):
+        lines = [
+            f'# HELP {self.name} {self.documentation}',
+            f'# TYPE {self.name} {self.kind}',
+        ]
+        lines.extend(f'{name} {value}' for name, value in self.samples())
+
+        return '\n'.join(lines)
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, *labels, amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def set(self, *labels, value: float):
+        with self._lock:
+            self._values[labels] = value
+
+
+class Gauge(Counter):
+    kind = 'gauge'
+
+    def dec(self, *labels, amount: float = 1):
+        self.inc(*labels, amount=-amount)
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(
+        self, name: str, documentation: str, labelnames=(), buckets=None
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets or DEFAULT_BUCKETS)
+
+    def observe(self, value: float, *labels):
+        index = bisect_left(self.buckets, value)
+
+        with self._lock:
+            counts, total = self._values.get(labels) or (
+                [0] * (len(self.buckets) + 1),
+                0.0,
+            )
+            counts[index] += 1
+            self._values[labels] = (counts, total + value)
+
+    def samples(self):
+        with self._lock:
+            values = {
+                labels: (list(counts), total)
+                for labels, (counts, total) in self._values.items()
+            }
+
+        for labels, (counts, total) in sorted(values.items()):
+            cumulative = 0
+            for bound, count in zip((*self.buckets, '+Inf'), counts):
+                cumulative += count
+                le = (('le', bound),)
+                yield (
+                    self.name
+                    + '_bucket'
+                    + _format_labels(self.labelnames, labels, le),
+                    cumulative,
+                )
+
+            suffix = _format_labels(self.labelnames, labels)
+            yield f'{self.name}_sum{suffix}', total
+            yield f'{self.name}_count{suffix}', cumulative
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+        self.collectors = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self):
+        for collect in self.collectors:
+            collect()
+
+        return '\n'.join(metric.render() for metric in self.metrics) + '\n'
+
+
+registry = Registry()
+
+http_requests = registry.register(
+    Counter(
+        'http_requests_total',
+        'HTTP requests by method, route and status code.',
+        ('method', 'route', 'status'),
+    )
+)
+http_request_duration = registry.register(
+    Histogram(
+        'http_request_duration_seconds',
+        'HTTP request latency by method and route.',
+        ('method', 'route'),
+    )
+)
+http_requests_in_progress = registry.register(
+    Gauge(
+        'http_requests_in_progress',
+        'HTTP requests currently being served.',
+        ('method',),
+    )
+)
+http_request_statements = registry.register(
+    Histogram(
+        'http_request_db_statements',
+        'SQL statements executed per HTTP request.',
+        ('method', 'route'),
+        buckets=STATEMENT_BUCKETS,
+    )
+)
+db_statement_duration = registry.register(
+    Histogram(
+        'db_statement_duration_seconds',
+        'SQL statement execution time.',
+        buckets=SQL_BUCKETS,
+    )
+)
+password_hash_duration = registry.register(
+    Histogram(
+        'password_hash_duration_seconds',
+        'Argon2 hash and verify time.',
+        ('operation',),
+    )
+)
+
+cache_requests = registry.register(
+    Counter(
+        'cache_requests_total',
+        'In-process cache lookups by cache and result.',
+        ('cache', 'result'),
+    )
+)
+db_pool_checkouts = registry.register(
+    Counter('db_pool_checkouts_total', 'Connection pool checkouts.')
+)
+db_pool_timeouts = registry.register(
+    Counter('db_pool_timeouts_total', 'Connection pool checkout timeouts.')
+)
+db_pool_wait = registry.register(
+    Counter(
+        'db_pool_wait_seconds_total',
+        'Time spent waiting for a pooled connection.',
+    )
+)
+
+_request_statements = ContextVar('request_statements', default=None)
+
+
+def _before_cursor_execute(conn, cursor, statement, *args):
+    conn.info['metrics_started_at'] = perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, *args):
+    started_at = conn.info.pop('metrics_started_at', None)
+    if started_at is not None:
+        db_statement_duration.observe(perf_counter() - started_at)
+
+    statements = _request_statements.get()
+    if statements is not None:
+        statements[0] += 1
+
+
+def instrument_engine(engine):
+    sync_engine = getattr(engine, 'sync_engine', engine)
+
+    if not event.contains(
+        sync_engine, 'before_cursor_execute', _before_cursor_execute
+    ):
+        event.listen(
+            sync_engine, 'before_cursor_execute', _before_cursor_execute
+        )
+        event.listen(
+            sync_engine, 'after_cursor_execute', _after_cursor_execute
+        )
+
+
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        method = scope['method']
+        status = [500]
+        statements = [0]
+        token = _request_statements.set(statements)
+
+        async def send_wrapper(message):
+            if message['type'] == 'http.response.start':
+                status[0] = message['status']
+            await send(message)
+
+        http_requests_in_progress.inc(method)
+        start = perf_counter()
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = perf_counter() - start
+            route = getattr(scope.get('route'), 'path', '<unmatched>')
+
+            http_requests_in_progress.dec(method)
+            http_requests.inc(method, route, str(status[0]))
+            http_request_duration.observe(elapsed, method, route)
+            http_request_statements.observe(statements[0], method, route)
+            _request_statements.reset(token)
@@ -1,11 +1,13 @@
 from datetime import datetime
 from enum import Enum
 
-from sqlalchemy import ForeignKey, func
+from sqlalchemy import DDL, ForeignKey, Index, event, func, text
 from sqlalchemy.orm import Mapped, mapped_column, registry, relationship
 
 table_registry = registry()
 
+TODO_SEARCH_VECTOR = "to_tsvector('simple', title || ' ' || description)"
+
 
 class TodoState(str, Enum):
     draft = 'draft'
@@ -18,11 +20,18 @@ class TodoState(str, Enum):
 @table_registry.mapped_as_dataclass
 class User:
     __tablename__ = 'users'
+    __mapper_args__ = {'eager_defaults': True}
 
     id: Mapped[int] = mapped_column(init=False, primary_key=True)
     username: Mapped[str] = mapped_column(unique=True)
     email: Mapped[str] = mapped_column(unique=True)
     password: Mapped[str]
+    token_version: Mapped[int] = mapped_column(
+        init=False, default=0, server_default=text('0')
+    )
+    deleted_at: Mapped[datetime | None] = mapped_column(
+        init=False, default=None
+    )
     created_at: Mapped[datetime] = mapped_column(
         init=False, server_default=func.now()
     )
@@ -31,13 +40,27 @@ class User:
     )
 
     todos: Mapped[list['Todo']] = relationship(
-        init=False, cascade='all, delete-orphan', lazy='selectin'
+        init=False,
+        cascade='all, delete-orphan',
+        lazy='raise',
+        passive_deletes=True,
     )
 
 
 @table_registry.mapped_as_dataclass
 class Todo:
     __tablename__ = 'todos'
+    __mapper_args__ = {'eager_defaults': True}
+    __table_args__ = (
+        Index('ix_todos_user_id_id', 'user_id', 'id'),
+        Index('ix_todos_user_id_state_id', 'user_id', 'state', 'id'),
+        Index('ix_todos_user_id_updated_at_id', 'user_id', 'updated_at', 'id'),
+        Index(
+            'ix_todos_search_vector',
+            text(TODO_SEARCH_VECTOR),
+            postgresql_using='gin',
+        ).ddl_if(dialect='postgresql'),
+    )
 
     id: Mapped[int] = mapped_column(init=False, primary_key=True)
     title: Mapped[str]
@@ -50,4 +73,215 @@ class Todo:
         init=False, server_default=func.now(), onupdate=func.now()
     )
 
-    user_id: Mapped[int] = mapped_column(ForeignKey('users.id'))
+    user_id: Mapped[int] = mapped_column(
+        ForeignKey('users.id', ondelete='CASCADE')
+    )
+
+
+@table_registry.mapped_as_dataclass
+class TodoStats:
+    __tablename__ = 'todo_stats'
+
+    user_id: Mapped[int] = mapped_column(primary_key=True)
+    state: Mapped[TodoState] = mapped_column(primary_key=True)
+    count: Mapped[int] = mapped_column(default=0)
+
+
+@table_registry.mapped_as_dataclass
+class TodoVersion:
+    __tablename__ = 'todo_versions'
+
+    user_id: Mapped[int] = mapped_column(primary_key=True, autoincrement=False)
+    version: Mapped[int] = mapped_column(default=0)
+    changed_at: Mapped[datetime] = mapped_column(
+        init=False, server_default=func.now()
+    )
+
+
+@table_registry.mapped_as_dataclass
+class TodoTombstone:
+    __tablename__ = 'todo_tombstones'
+    __table_args__ = (
+        Index(
+            'ix_todo_tombstones_user_id_deleted_at_id',
+            'user_id',
+            'deleted_at',
+            'id',
+        ),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=False)
+    user_id: Mapped[int]
+    deleted_at: Mapped[datetime] = mapped_column(
+        init=False, server_default=func.now()
+    )
+
+
+# every write also moves its owner's todo_versions row, which backs the
+# list ETag and replica stickiness
+TODO_STATS_FUNCTION = """
+CREATE OR REPLACE FUNCTION todo_stats_apply() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO todo_stats (user_id, state, count)
+        SELECT user_id, state, count(*) FROM new_rows GROUP BY 1, 2
+        ON CONFLICT (user_id, state)
+        DO UPDATE SET count = todo_stats.count + excluded.count;
+
+        INSERT INTO todo_versions (user_id, version)
+        SELECT DISTINCT user_id, 1 FROM new_rows
+        ON CONFLICT (user_id)
+        DO UPDATE SET version = todo_versions.version + 1, changed_at = now();
+    ELSIF TG_OP = 'UPDATE' THEN
+        INSERT INTO todo_stats (user_id, state, count)
+        SELECT user_id, state, sum(delta) FROM (
+            SELECT user_id, state, 1 AS delta FROM new_rows
+            UNION ALL
+            SELECT user_id, state, -1 AS delta FROM old_rows
+        ) AS deltas
+        GROUP BY 1, 2
+        HAVING sum(delta) <> 0
+        ON CONFLICT (user_id, state)
+        DO UPDATE SET count = todo_stats.count + excluded.count;
+
+        INSERT INTO todo_versions (user_id, version)
+        SELECT user_id, 1 FROM new_rows
+        UNION SELECT user_id, 1 FROM old_rows
+        ON CONFLICT (user_id)
+        DO UPDATE SET version = todo_versions.version + 1, changed_at = now();
+    ELSE
+        UPDATE todo_stats SET count = todo_stats.count - deleted.count
+        FROM (
+            SELECT user_id, state, count(*) AS count
+            FROM old_rows GROUP BY 1, 2
+        ) AS deleted
+        WHERE todo_stats.user_id = deleted.user_id
+            AND todo_stats.state = deleted.state;
+
+        INSERT INTO todo_versions (user_id, version)
+        SELECT DISTINCT user_id, 1 FROM old_rows
+        ON CONFLICT (user_id)
+        DO UPDATE SET version = todo_versions.version + 1, changed_at = now();
+    END IF;
+
+    RETURN NULL;
+END
+$$
+"""
+
+TODO_STATS_TRIGGERS = {
+    'INSERT': 'REFERENCING NEW TABLE AS new_rows',
+    'UPDATE': 'REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows',
+    'DELETE': 'REFERENCING OLD TABLE AS old_rows',
+}
+
+
+def todo_stats_trigger(operation: str):
+    return (
+        f'CREATE TRIGGER todo_stats_{operation.lower()} '
+        f'AFTER {operation} ON todos {TODO_STATS_TRIGGERS[operation]} '
+        'FOR EACH STATEMENT EXECUTE FUNCTION todo_stats_apply()'
+    )
+
+
+event.listen(
+    Todo.__table__,
+    'after_create',
+    DDL(TODO_STATS_FUNCTION).execute_if(dialect='postgresql'),
+)
+
+for operation in TODO_STATS_TRIGGERS:
+    event.listen(
+        Todo.__table__,
+        'after_create',
+        DDL(todo_stats_trigger(operation)).execute_if(dialect='postgresql'),
+    )
+
+# todos removed along with their user leave no tombstones behind
+TODO_TOMBSTONES_FUNCTION = """
+CREATE OR REPLACE FUNCTION todo_tombstones_record() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    INSERT INTO todo_tombstones (id, user_id)
+    SELECT old_rows.id, old_rows.user_id FROM old_rows
+    JOIN users ON users.id = old_rows.user_id
+    WHERE users.deleted_at IS NULL
+    ON CONFLICT (id) DO UPDATE SET deleted_at = excluded.deleted_at;
+
+    RETURN NULL;
+END
+$$
+"""
+
+TODO_TOMBSTONES_TRIGGER = (
+    'CREATE TRIGGER todo_tombstones_delete '
+    'AFTER DELETE ON todos REFERENCING OLD TABLE AS old_rows '
+    'FOR EACH STATEMENT EXECUTE FUNCTION todo_tombstones_record()'
+)
+
+for ddl in (TODO_TOMBSTONES_FUNCTION, TODO_TOMBSTONES_TRIGGER):
+    event.listen(
+        Todo.__table__,
+        'after_create',
+        DDL(ddl).execute_if(dialect='postgresql'),
+    )
+
+# statements changing more than 100 rows (bulk writes, imports, user
+# deletes) send one resync per user instead of an event per todo
+TODO_CHANGES_FUNCTION = """
+CREATE OR REPLACE FUNCTION todo_changes_notify() RETURNS trigger
+LANGUAGE plpgsql AS $$
+DECLARE
+    op text := CASE TG_OP
+        WHEN 'INSERT' THEN 'created'
+        WHEN 'UPDATE' THEN 'updated'
+        ELSE 'deleted'
+    END;
+    changed_rows text := CASE TG_OP
+        WHEN 'DELETE' THEN 'old_rows'
+        ELSE 'new_rows'
+    END;
+    changed bigint;
+BEGIN
+    EXECUTE 'SELECT count(*) FROM ' || quote_ident(changed_rows)
+    INTO changed;
+
+    IF changed > 100 THEN
+        EXECUTE $q$
+            SELECT pg_notify('todo_changes', json_build_object(
+                'user_id', user_id, 'op', 'resync'
+            )::text)
+            FROM $q$ || quote_ident(changed_rows) || ' GROUP BY user_id';
+    ELSE
+        EXECUTE $q$
+            SELECT pg_notify('todo_changes', json_build_object(
+                'user_id', user_id, 'op', $q$ || quote_literal(op) || $q$,
+                'id', id
+            )::text)
+            FROM $q$ || quote_ident(changed_rows) || ' ORDER BY id';
+    END IF;
+
+    RETURN NULL;
+END
+$$
+"""
+
+
+def todo_changes_trigger(operation: str):
+    return (
+        f'CREATE TRIGGER todo_changes_{operation.lower()} '
+        f'AFTER {operation} ON todos {TODO_STATS_TRIGGERS[operation]} '
+        'FOR EACH STATEMENT EXECUTE FUNCTION todo_changes_notify()'
+    )
+
+
+for ddl in (
+    TODO_CHANGES_FUNCTION,
+    *map(todo_changes_trigger, TODO_STATS_TRIGGERS),
+):
+    event.listen(
+        Todo.__table__,
+        'after_create',
+        DDL(ddl).execute_if(dialect='postgresql'),
+    )
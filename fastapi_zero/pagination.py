@@ -0,0 +1,54 @@
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from binascii import Error as BinasciiError
+from datetime import datetime
+
+
+def encode_cursor(last_id: int):
+    return urlsafe_b64encode(str(last_id).encode()).decode()
+
+
+def decode_cursor(cursor: str):
+    try:
+        return int(urlsafe_b64decode(cursor.encode()).decode())
+    except (BinasciiError, UnicodeDecodeError, ValueError):
+        raise ValueError('Invalid cursor')
+
+
+def encode_watermark(changed_at: datetime, last_id: int):
+    return urlsafe_b64encode(
+        f'{changed_at.isoformat()}|{last_id}'.encode()
+    ).decode()
+
+
+def decode_watermark(watermark: str):
+    try:
+        changed_at, last_id = (
+            urlsafe_b64decode(watermark.encode()).decode().split('|')
+        )
+        changed_at, last_id = datetime.fromisoformat(changed_at), int(last_id)
+    except (BinasciiError, UnicodeDecodeError, ValueError):
+        raise ValueError('Invalid watermark')
+
+    # watermarks carry the naive timestamps the database stored
+    if changed_at.tzinfo is not None:
+        raise ValueError('Invalid watermark')
+
+    return changed_at, last_id
+
+
+def paginate(query, key, filter_page):
+    query = query.order_by(key)
+
+    if filter_page.cursor:
+        return query.where(key > decode_cursor(filter_page.cursor)).limit(
+            filter_page.limit
+        )
+
+    return query.offset(filter_page.offset).limit(filter_page.limit)
+
+
+def next_cursor(rows, filter_page):
+    if filter_page.limit and len(rows) == filter_page.limit:
+        return encode_cursor(rows[-1].id)
+
+    return None
@@ -0,0 +1,95 @@
+import argparse
+import asyncio
+
+from sqlalchemy import Connection, text
+
+from fastapi_zero.database import build_engine
+from fastapi_zero.settings import get_settings
+
+TODO_INDEXES = """
+    SELECT indexdef FROM pg_indexes
+    WHERE schemaname = current_schema() AND tablename = 'todos'
+        AND indexname <> 'todos_pkey'
+"""
+TODO_FOREIGN_KEYS = """
+    SELECT 'ALTER TABLE todos ADD CONSTRAINT ' || quote_ident(conname)
+        || ' ' || pg_get_constraintdef(oid)
+    FROM pg_constraint
+    WHERE conrelid = 'todos'::regclass AND contype = 'f'
+"""
+TODO_TRIGGERS = """
+    SELECT pg_get_triggerdef(oid) FROM pg_trigger
+    WHERE tgrelid = 'todos'::regclass AND NOT tgisinternal
+"""
+
+
+def todo_partitions(connection: Connection):
+    return connection.scalar(
+        text("""
+            SELECT count(*) FROM pg_inherits
+            WHERE inhparent = 'todos'::regclass
+        """)
+    )
+
+
+# partitions=0 rebuilds the plain, unpartitioned table
+def rebuild_todos(connection: Connection, partitions: int):
+    if todo_partitions(connection) == partitions:
+        return
+
+    # whatever the schema defines on todos right now is recreated as is
+    recreate = [
+        *(
+            definition.replace(' ON ONLY ', ' ON ')
+            for definition in connection.scalars(text(TODO_INDEXES))
+        ),
+        *connection.scalars(text(TODO_FOREIGN_KEYS)),
+        *connection.scalars(text(TODO_TRIGGERS)),
+    ]
+
+    layout = ' PARTITION BY HASH (user_id)' if partitions else ''
+    primary_key = '(id, user_id)' if partitions else '(id)'
+
+    statements = [
+        'ALTER SEQUENCE todos_id_seq OWNED BY NONE',
+        f'CREATE TABLE todos_rebuilt (LIKE todos INCLUDING DEFAULTS){layout}',
+        *(
+            f'CREATE TABLE todos_h{partitions}_{remainder} '
+            'PARTITION OF todos_rebuilt '
+            f'FOR VALUES WITH (MODULUS {partitions}, REMAINDER {remainder})'
+            for remainder in range(partitions)
+        ),
+        'INSERT INTO todos_rebuilt SELECT * FROM todos',
+        'DROP TABLE todos',
+        'ALTER TABLE todos_rebuilt RENAME TO todos',
+        f'ALTER TABLE todos ADD CONSTRAINT todos_pkey '
+        f'PRIMARY KEY {primary_key}',
+        'ALTER SEQUENCE todos_id_seq OWNED BY todos.id',
+        *recreate,
+    ]
+    for statement in statements:
+        connection.execute(text(statement))
+
+
+async def main(partitions: int):
+    engine = build_engine(get_settings())
+
+    async with engine.begin() as connection:
+        await connection.run_sync(rebuild_todos, partitions)
+
+    await engine.dispose()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description=(
+            'Rewrite todos as a table hash-partitioned by user_id, or as '
+            'the plain table with --partitions 0. Run it after '
+            '`alembic upgrade head`; it rewrites the table in one '
+            'transaction.'
+        )
+    )
+    parser.add_argument('--partitions', type=int, required=True)
+    args = parser.parse_args()
+
+    asyncio.run(main(args.partitions))
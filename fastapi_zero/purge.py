@@ -0,0 +1,70 @@
+import argparse
+import asyncio
+
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from fastapi_zero.database import build_engine
+from fastapi_zero.models import Todo, TodoStats, TodoVersion, User
+from fastapi_zero.settings import get_settings
+
+
+async def purge_user(engine, user_id: int, batch_size: int):
+    async with AsyncSession(engine) as session:
+        while True:
+            batch = (
+                select(Todo.id)
+                .where(Todo.user_id == user_id)
+                .limit(batch_size)
+                .scalar_subquery()
+            )
+            result = await session.execute(
+                delete(Todo)
+                .where(Todo.user_id == user_id, Todo.id.in_(batch))
+                .execution_options(synchronize_session=False)
+            )
+            await session.commit()
+
+            if result.rowcount < batch_size:
+                break
+
+        await session.execute(delete(User).where(User.id == user_id))
+        await session.execute(
+            delete(TodoStats).where(TodoStats.user_id == user_id)
+        )
+        await session.execute(
+            delete(TodoVersion).where(TodoVersion.user_id == user_id)
+        )
+        await session.commit()
+
+
+async def purge_deleted_users(engine, batch_size: int):
+    async with AsyncSession(engine) as session:
+        user_ids = (
+            await session.scalars(
+                select(User.id).where(User.deleted_at.is_not(None))
+            )
+        ).all()
+
+    for user_id in user_ids:
+        await purge_user(engine, user_id, batch_size)
+
+    return len(user_ids)
+
+
+async def main(batch_size: int):
+    engine = build_engine(get_settings())
+    await purge_deleted_users(engine, batch_size)
+    await engine.dispose()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Finish purging users marked deleted.'
+    )
+    parser.add_argument(
+        '--batch-size', type=int, default=get_settings().USER_PURGE_BATCH_SIZE
+    )
+    args = parser.parse_args()
+
+    asyncio.run(main(args.batch_size))
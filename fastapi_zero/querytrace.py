@@ -0,0 +1,138 @@
+import logging
+from collections import Counter
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from time import perf_counter
+
+from sqlalchemy import event
+
+from fastapi_zero.settings import Settings
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class QueryTrace:
+    statements: list[tuple[str, float]] = field(default_factory=list)
+
+    @property
+    def duration(self):
+        return sum(seconds for _, seconds in self.statements)
+
+
+_current_trace = ContextVar('query_trace', default=None)
+
+
+def _before_cursor_execute(conn, cursor, statement, *args):
+    if _current_trace.get() is not None:
+        conn.info['querytrace_started_at'] = perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, *args):
+    trace = _current_trace.get()
+    started_at = conn.info.pop('querytrace_started_at', None)
+
+    if trace is not None and started_at is not None:
+        trace.statements.append((statement, perf_counter() - started_at))
+
+
+def instrument_engine(engine):
+    sync_engine = getattr(engine, 'sync_engine', engine)
+
+    if not event.contains(
+        sync_engine, 'before_cursor_execute', _before_cursor_execute
+    ):
+        event.listen(
+            sync_engine, 'before_cursor_execute', _before_cursor_execute
+        )
+        event.listen(
+            sync_engine, 'after_cursor_execute', _after_cursor_execute
+        )
+
+
+def find_problems(trace: QueryTrace, settings: Settings):
+    problems = []
+    count = len(trace.statements)
+    duration_ms = trace.duration * 1000
+
+    if count > settings.QUERY_TRACE_MAX_STATEMENTS:
+        problems.append(
+            f'{count} statements exceed the budget of '
+            f'{settings.QUERY_TRACE_MAX_STATEMENTS}'
+        )
+
+    if duration_ms > settings.QUERY_TRACE_MAX_DURATION_MS:
+        problems.append(
+            f'{duration_ms:.1f}ms in SQL exceeds the budget of '
+            f'{settings.QUERY_TRACE_MAX_DURATION_MS}ms'
+        )
+
+    repeated = Counter(statement for statement, _ in trace.statements)
+    for statement, times in repeated.most_common():
+        if times < settings.QUERY_TRACE_REPEAT_THRESHOLD:
+            break
+
+        problems.append(
+            f'possible N+1: statement ran {times} times: '
+            f'{" ".join(statement.split())[:200]}'
+        )
+
+    return problems
+
+
+def server_timing(trace: QueryTrace, problems: list[str]):
+    metrics = [
+        f'db;dur={trace.duration * 1000:.2f};'
+        f'desc="{len(trace.statements)} statements"'
+    ]
+    if problems:
+        metrics.append(f'querytrace;desc="{len(problems)} problems"')
+
+    return ', '.join(metrics)
+
+
+class QueryTraceMiddleware:
+    def __init__(self, app, settings: Settings):
+        self.app = app
+        self.settings = settings
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        trace = QueryTrace()
+        token = _current_trace.set(trace)
+
+        async def send_wrapper(message):
+            if message['type'] == 'http.response.start':
+                header = server_timing(
+                    trace, find_problems(trace, self.settings)
+                )
+                message['headers'] = [
+                    *message.get('headers', []),
+                    (b'server-timing', header.encode('latin-1')),
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current_trace.reset(token)
+            self.report(scope, trace)
+
+    def report(self, scope, trace: QueryTrace):
+        route = getattr(scope.get('route'), 'path', scope['path'])
+        problems = find_problems(trace, self.settings)
+
+        for statement, seconds in trace.statements:
+            logger.debug(
+                '%s %s %.2fms %s',
+                scope['method'],
+                route,
+                seconds * 1000,
+                ' '.join(statement.split()),
+            )
+
+        for problem in problems:
+            logger.warning('%s %s: %s', scope['method'], route, problem)
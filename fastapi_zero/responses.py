@@ -0,0 +1,14 @@
+from fastapi.responses import JSONResponse
+from pydantic_core import to_json
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content):  # noqa: PLR6301
+        return to_json(content)
+
+
+async def fetch_public_rows(session, query, model, schema):
+    columns = [getattr(model, field) for field in schema.model_fields]
+    rows = await session.execute(query.with_only_columns(*columns))
+
+    return rows.all()
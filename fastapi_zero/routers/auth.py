@@ -10,14 +10,16 @@ from fastapi_zero.database import get_session
 from fastapi_zero.models import User
 from fastapi_zero.schemas import Token
 from fastapi_zero.security import (
+    Principal,
+    access_token_claims,
     create_access_token,
-    get_current_user,
-    verify_password,
+    get_current_principal,
+    verify_password_async,
 )
 
 router = APIRouter(prefix='/auth', tags=['auth'])
 
-T_CurrentUser = Annotated[User, Depends(get_current_user)]
+T_CurrentUser = Annotated[Principal, Depends(get_current_principal)]
 T_OAuth2Form = Annotated[OAuth2PasswordRequestForm, Depends()]
 T_Session = Annotated[AsyncSession, Depends(get_session)]
 
@@ -25,7 +27,9 @@ T_Session = Annotated[AsyncSession, Depends(get_session)]
 @router.post('/token', response_model=Token)
 async def login_for_access_token(session: T_Session, form_data: T_OAuth2Form):
     user = await session.scalar(
-        select(User).where(User.email == form_data.username)
+        select(User).where(
+            User.email == form_data.username, User.deleted_at.is_(None)
+        )
     )
 
     if not user:
@@ -34,19 +38,19 @@ async def login_for_access_token(session: T_Session, form_data: T_OAuth2Form):
             detail='Incorrect email or password',
         )
 
-    if not verify_password(form_data.password, user.password):
+    if not await verify_password_async(form_data.password, user.password):
         raise HTTPException(
             status_code=HTTPStatus.UNAUTHORIZED,
             detail='Incorrect email or password',
         )
 
-    access_token = create_access_token(data={'sub': user.email})
+    access_token = create_access_token(data=access_token_claims(user))
 
     return {'access_token': access_token, 'token_type': 'Bearer'}
 
 
 @router.post('/refresh', response_model=Token)
 async def refresh_access_token(user: T_CurrentUser):
-    new_access_token = create_access_token(data={'sub': user.email})
+    new_access_token = create_access_token(data=access_token_claims(user))
 
     return {'access_token': new_access_token, 'token_type': 'bearer'}
@@ -1,31 +1,159 @@
+import csv
+import io
+from functools import partial
 from http import HTTPStatus
-from typing import Annotated
+from typing import Annotated, Literal
 
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy import select
+from fastapi import (
+    APIRouter,
+    Depends,
+    HTTPException,
+    Query,
+    Request,
+    Response,
+)
+from fastapi.responses import StreamingResponse
+from sqlalchemy import (
+    delete,
+    func,
+    insert,
+    literal_column,
+    or_,
+    select,
+    update,
+)
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from fastapi_zero.database import get_session
-from fastapi_zero.models import Todo, User
+from fastapi_zero.changefeed import (
+    RESYNC,
+    ChangeBus,
+    get_change_bus,
+    stream_changes,
+)
+from fastapi_zero.changes import read_todo_changes, tombstone_horizon
+from fastapi_zero.database import get_session, read_engine
+from fastapi_zero.etag import etag_matches, not_modified, weak_etag
+from fastapi_zero.importer import import_todos
+from fastapi_zero.models import TODO_SEARCH_VECTOR, Todo
+from fastapi_zero.pagination import decode_watermark, next_cursor, paginate
+from fastapi_zero.responses import FastJSONResponse, fetch_public_rows
 from fastapi_zero.schemas import (
+    FilterChanges,
     FilterTodo,
+    FilterTodoExport,
     Message,
+    TodoBulkCreate,
+    TodoBulkDelete,
+    TodoBulkResults,
+    TodoBulkUpdate,
+    TodoChanges,
+    TodoFilters,
+    TodoImportResult,
     TodoList,
     TodoPublic,
     TodoSchema,
+    TodoStatsPublic,
     TodoUpdate,
 )
-from fastapi_zero.security import get_current_user
+from fastapi_zero.security import (
+    Principal,
+    get_current_principal,
+    still_signed_in,
+)
+from fastapi_zero.settings import get_settings
+from fastapi_zero.stats import read_todo_stats, read_todo_version
+
+settings = get_settings()
 
 router = APIRouter(prefix='/todos', tags=['todos'])
 
-T_CurrentUser = Annotated[User, Depends(get_current_user)]
+T_CurrentUser = Annotated[Principal, Depends(get_current_principal)]
 T_Session = Annotated[AsyncSession, Depends(get_session)]
+T_ChangeBus = Annotated[ChangeBus, Depends(get_change_bus)]
+
+EXPORT_FIELDS = list(TodoPublic.model_fields)
+
+
+def search_clause(session: AsyncSession, search: str):
+    if session.bind.dialect.name == 'postgresql':
+        return literal_column(TODO_SEARCH_VECTOR).op('@@')(
+            func.websearch_to_tsquery(literal_column("'simple'"), search)
+        )
+
+    return or_(
+        Todo.title.icontains(search, autoescape=True),
+        Todo.description.icontains(search, autoescape=True),
+    )
+
+
+def filter_todos_query(
+    session: AsyncSession, user_id: int, filter_todos: TodoFilters
+):
+    query = select(Todo).where(Todo.user_id == user_id)
+
+    if filter_todos.title:
+        query = query.filter(Todo.title.contains(filter_todos.title))
+
+    if filter_todos.description:
+        query = query.filter(
+            Todo.description.contains(filter_todos.description)
+        )
+
+    if filter_todos.state:
+        query = query.filter(Todo.state == filter_todos.state)
+
+    if filter_todos.search:
+        query = query.filter(search_clause(session, filter_todos.search))
+
+    return query
+
+
+def ndjson_chunk(todos):
+    return ''.join(
+        TodoPublic.model_validate(todo, from_attributes=True).model_dump_json()
+        + '\n'
+        for todo in todos
+    )
+
+
+def csv_chunk(todos, header=False):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_FIELDS)
+
+    if header:
+        writer.writeheader()
+
+    writer.writerows(
+        TodoPublic.model_validate(todo, from_attributes=True).model_dump(
+            mode='json'
+        )
+        for todo in todos
+    )
+
+    return buffer.getvalue()
+
+
+async def stream_todos(engine, query, export_format):
+    if export_format == 'csv':
+        yield csv_chunk([], header=True)
+
+    async with AsyncSession(engine) as session:
+        todos = await session.stream_scalars(
+            query.order_by(Todo.id).execution_options(
+                yield_per=settings.TODO_EXPORT_BATCH_SIZE
+            )
+        )
+
+        async for partition in todos.partitions():
+            if export_format == 'csv':
+                yield csv_chunk(partition)
+            else:
+                yield ndjson_chunk(partition)
 
 
 @router.post('/', response_model=TodoPublic)
 async def create_todo(
-    todo: TodoSchema, user: T_CurrentUser, session: T_Session
+    todo: TodoSchema, user: T_CurrentUser, session: T_Session, bus: T_ChangeBus
 ):
     db_todo = Todo(
         title=todo.title,
@@ -35,75 +163,344 @@ async def create_todo(
     )
 
     session.add(db_todo)
+    await session.flush()
+    await bus.publish(
+        session, {'user_id': user.id, 'op': 'created', 'id': db_todo.id}
+    )
     await session.commit()
-    await session.refresh(db_todo)
 
     return db_todo
 
 
-@router.get('/', status_code=HTTPStatus.OK, response_model=TodoList)
+@router.get(
+    '/',
+    status_code=HTTPStatus.OK,
+    response_model=TodoList,
+    responses={HTTPStatus.NOT_MODIFIED: {'description': 'Not Modified'}},
+)
 async def list_todos(
+    request: Request,
+    response: Response,
     session: T_Session,
     user: T_CurrentUser,
     filter_todos: Annotated[FilterTodo, Query()],
 ):
-    query = select(Todo).where(Todo.user_id == user.id)
+    version = await read_todo_version(session, user.id)
+    etag = weak_etag(user.id, version, str(request.query_params))
 
-    if filter_todos.title:
-        query = query.filter(Todo.title.contains(filter_todos.title))
+    if etag_matches(request, etag):
+        return not_modified(etag)
 
-    if filter_todos.description:
-        query = query.filter(
-            Todo.description.contains(filter_todos.description)
+    query = paginate(
+        filter_todos_query(session, user.id, filter_todos),
+        Todo.id,
+        filter_todos,
+    )
+
+    if settings.FAST_LIST_RESPONSES:
+        rows = await fetch_public_rows(session, query, Todo, TodoPublic)
+        return FastJSONResponse(
+            {
+                'todos': [row._asdict() for row in rows],
+                'next_cursor': next_cursor(rows, filter_todos),
+            },
+            headers={'ETag': etag},
         )
 
-    if filter_todos.state:
-        query = query.filter(Todo.state == filter_todos.state)
+    todos = (await session.scalars(query)).all()
+    response.headers['ETag'] = etag
+
+    return {'todos': todos, 'next_cursor': next_cursor(todos, filter_todos)}
+
+
+@router.get(
+    '/stats', status_code=HTTPStatus.OK, response_model=TodoStatsPublic
+)
+async def todo_stats(session: T_Session, user: T_CurrentUser):
+    return await read_todo_stats(session, user.id)
+
+
+@router.get(
+    '/changes',
+    status_code=HTTPStatus.OK,
+    response_model=TodoChanges,
+    responses={HTTPStatus.GONE: {'description': 'Watermark expired'}},
+)
+async def list_todo_changes(
+    session: T_Session,
+    user: T_CurrentUser,
+    filter_changes: Annotated[FilterChanges, Query()],
+):
+    if filter_changes.since:
+        changed_at, _ = decode_watermark(filter_changes.since)
 
-    todos = await session.scalars(
-        query.offset(filter_todos.offset).limit(filter_todos.limit)
+        horizon = await session.scalar(
+            select(tombstone_horizon(settings.TODO_TOMBSTONE_RETENTION_DAYS))
+        )
+
+        if changed_at < horizon:
+            raise HTTPException(
+                status_code=HTTPStatus.GONE,
+                detail='Watermark expired, sync the full list again.',
+            )
+
+    return await read_todo_changes(
+        session,
+        user.id,
+        filter_changes.since,
+        filter_changes.limit,
+        settings.TODO_CHANGES_SETTLE_SECONDS,
     )
 
-    return {'todos': todos.all()}
+
+@router.get(
+    '/stream',
+    status_code=HTTPStatus.OK,
+    response_class=StreamingResponse,
+    responses={HTTPStatus.OK: {'content': {'text/event-stream': {}}}},
+)
+async def stream_todo_changes(
+    session: T_Session, user: T_CurrentUser, bus: T_ChangeBus
+):
+    return StreamingResponse(
+        stream_changes(
+            bus,
+            user.id,
+            settings.TODO_STREAM_KEEPALIVE_SECONDS,
+            partial(still_signed_in, session.bind, user),
+        ),
+        media_type='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+    )
+
+
+@router.get(
+    '/export',
+    status_code=HTTPStatus.OK,
+    response_class=StreamingResponse,
+    responses={
+        HTTPStatus.OK: {
+            'content': {'application/x-ndjson': {}, 'text/csv': {}}
+        }
+    },
+)
+async def export_todos(
+    session: T_Session,
+    user: T_CurrentUser,
+    filter_todos: Annotated[FilterTodoExport, Query()],
+):
+    query = filter_todos_query(session, user.id, filter_todos)
+
+    if filter_todos.format == 'csv':
+        return StreamingResponse(
+            stream_todos(read_engine(session), query, 'csv'),
+            media_type='text/csv',
+            headers={'Content-Disposition': 'attachment; filename=todos.csv'},
+        )
+
+    return StreamingResponse(
+        stream_todos(read_engine(session), query, 'ndjson'),
+        media_type='application/x-ndjson',
+    )
+
+
+@router.post(
+    '/bulk', status_code=HTTPStatus.OK, response_model=TodoBulkResults
+)
+async def create_todos_bulk(
+    todos: TodoBulkCreate,
+    user: T_CurrentUser,
+    session: T_Session,
+    bus: T_ChangeBus,
+):
+    if not todos.todos:
+        return {'results': []}
+
+    db_todos = await session.scalars(
+        insert(Todo).returning(Todo, sort_by_parameter_order=True),
+        [{**todo.model_dump(), 'user_id': user.id} for todo in todos.todos],
+    )
+    db_todos = db_todos.all()
+    await bus.publish_many(
+        session, user.id, 'created', [db_todo.id for db_todo in db_todos]
+    )
+    await session.commit()
+
+    return {
+        'results': [
+            {'id': db_todo.id, 'status': 'created', 'todo': db_todo}
+            for db_todo in db_todos
+        ]
+    }
+
+
+@router.post(
+    '/import',
+    status_code=HTTPStatus.OK,
+    response_model=TodoImportResult,
+    openapi_extra={
+        'requestBody': {
+            'required': True,
+            'content': {
+                'application/x-ndjson': {'schema': {'type': 'string'}},
+                'text/csv': {'schema': {'type': 'string'}},
+            },
+        }
+    },
+)
+async def import_todos_stream(
+    request: Request,
+    user: T_CurrentUser,
+    session: T_Session,
+    bus: T_ChangeBus,
+    import_format: Annotated[
+        Literal['ndjson', 'csv'], Query(alias='format')
+    ] = 'ndjson',
+):
+    # COPY returns no ids: subscribers resync once the import commits
+    await bus.publish(session, {'user_id': user.id, **RESYNC})
+
+    return await import_todos(
+        session,
+        user.id,
+        request.stream(),
+        import_format,
+        settings.TODO_IMPORT_BATCH_SIZE,
+        settings.TODO_IMPORT_MAX_RECORD_SIZE,
+    )
+
+
+@router.patch(
+    '/bulk', status_code=HTTPStatus.OK, response_model=TodoBulkResults
+)
+async def patch_todos_bulk(
+    todos: TodoBulkUpdate,
+    user: T_CurrentUser,
+    session: T_Session,
+    bus: T_ChangeBus,
+):
+    ids = [todo.id for todo in todos.todos]
+
+    owned_ids = set(
+        await session.scalars(
+            select(Todo.id).where(Todo.user_id == user.id, Todo.id.in_(ids))
+        )
+    )
+    changes = [
+        todo.model_dump(exclude_unset=True)
+        for todo in todos.todos
+        if todo.id in owned_ids and todo.model_fields_set - {'id'}
+    ]
+    changed_ids = {values['id'] for values in changes}
+
+    if changes:
+        await session.execute(update(Todo), changes)
+        await bus.publish_many(session, user.id, 'updated', changed_ids)
+
+    db_todos = await session.scalars(
+        select(Todo)
+        .where(Todo.id.in_(owned_ids))
+        .execution_options(populate_existing=True)
+    )
+    db_todos = {db_todo.id: db_todo for db_todo in db_todos}
+    await session.commit()
+
+    return {
+        'results': [
+            {
+                'id': todo_id,
+                'status': 'updated' if todo_id in changed_ids else 'unchanged',
+                'todo': db_todos[todo_id],
+            }
+            if todo_id in db_todos
+            else {'id': todo_id, 'status': 'not_found'}
+            for todo_id in ids
+        ]
+    }
+
+
+@router.delete(
+    '/bulk', status_code=HTTPStatus.OK, response_model=TodoBulkResults
+)
+async def delete_todos_bulk(
+    todos: TodoBulkDelete,
+    user: T_CurrentUser,
+    session: T_Session,
+    bus: T_ChangeBus,
+):
+    deleted_ids = set(
+        await session.scalars(
+            delete(Todo)
+            .where(Todo.user_id == user.id, Todo.id.in_(todos.ids))
+            .returning(Todo.id)
+        )
+    )
+    await bus.publish_many(session, user.id, 'deleted', deleted_ids)
+    await session.commit()
+
+    return {
+        'results': [
+            {
+                'id': todo_id,
+                'status': 'deleted' if todo_id in deleted_ids else 'not_found',
+            }
+            for todo_id in todos.ids
+        ]
+    }
 
 
 @router.patch(
     '/{todo_id}', status_code=HTTPStatus.OK, response_model=TodoPublic
 )
 async def patch_todo(
-    session: T_Session, user: T_CurrentUser, todo: TodoUpdate, todo_id: int
+    session: T_Session,
+    user: T_CurrentUser,
+    bus: T_ChangeBus,
+    todo: TodoUpdate,
+    todo_id: int,
 ):
-    db_todo = await session.scalar(
-        select(Todo).where(Todo.user_id == user.id, Todo.id == todo_id)
-    )
+    values = todo.model_dump(exclude_unset=True)
+    where = (Todo.user_id == user.id, Todo.id == todo_id)
+
+    if values:
+        statement = update(Todo).where(*where).values(**values)
+        db_todo = await session.scalar(statement.returning(Todo))
+    else:
+        db_todo = await session.scalar(select(Todo).where(*where))
 
     if not db_todo:
         raise HTTPException(
             status_code=HTTPStatus.NOT_FOUND, detail='Task not found.'
         )
 
-    for key, value in todo.model_dump(exclude_unset=True).items():
-        setattr(db_todo, key, value)
+    if values:
+        await bus.publish(
+            session, {'user_id': user.id, 'op': 'updated', 'id': todo_id}
+        )
 
-    session.add(db_todo)
     await session.commit()
-    await session.refresh(db_todo)
 
     return db_todo
 
 
 @router.delete('/{todo_id}', response_model=Message)
-async def delete_todo(session: T_Session, user: T_CurrentUser, todo_id: int):
-    db_todo = await session.scalar(
-        select(Todo).where(Todo.user_id == user.id, Todo.id == todo_id)
+async def delete_todo(
+    session: T_Session, user: T_CurrentUser, bus: T_ChangeBus, todo_id: int
+):
+    deleted_id = await session.scalar(
+        delete(Todo)
+        .where(Todo.user_id == user.id, Todo.id == todo_id)
+        .returning(Todo.id)
     )
 
-    if not db_todo:
+    if not deleted_id:
         raise HTTPException(
             status_code=HTTPStatus.NOT_FOUND, detail='Task not found.'
         )
 
-    await session.delete(db_todo)
+    await bus.publish(
+        session, {'user_id': user.id, 'op': 'deleted', 'id': deleted_id}
+    )
     await session.commit()
 
     return {'message': 'Task has been deleted successfully.'}
@@ -1,25 +1,51 @@
 from http import HTTPStatus
 from typing import Annotated
 
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy import select
+from fastapi import (
+    APIRouter,
+    BackgroundTasks,
+    Depends,
+    HTTPException,
+    Query,
+    Request,
+    Response,
+)
+from sqlalchemy import delete, func, select
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
 
 from fastapi_zero.database import get_session
-from fastapi_zero.models import User
+from fastapi_zero.etag import etag_matches, not_modified, weak_etag
+from fastapi_zero.models import TodoStats, TodoVersion, User
+from fastapi_zero.pagination import next_cursor, paginate
+from fastapi_zero.purge import purge_user
+from fastapi_zero.responses import FastJSONResponse, fetch_public_rows
 from fastapi_zero.schemas import (
     FilterPage,
     Message,
     UserList,
     UserPublic,
     UserSchema,
+    UserWithTodos,
+)
+from fastapi_zero.security import (
+    Principal,
+    get_current_principal,
+    get_current_user,
+    get_password_hash_async,
+    principal_cache,
+    token_version_cache,
 )
-from fastapi_zero.security import get_current_user, get_password_hash
+from fastapi_zero.settings import get_settings
+from fastapi_zero.stats import read_todo_stats
+
+settings = get_settings()
 
 router = APIRouter(prefix='/users', tags=['users'])
 
 T_CurrentUser = Annotated[User, Depends(get_current_user)]
+T_CurrentPrincipal = Annotated[Principal, Depends(get_current_principal)]
 T_Session = Annotated[AsyncSession, Depends(get_session)]
 
 
@@ -46,13 +72,12 @@ async def create_user(user: UserSchema, session: T_Session):
 
     db_user = User(
         username=user.username,
-        password=get_password_hash(user.password),
+        password=await get_password_hash_async(user.password),
         email=user.email,
     )
 
     session.add(db_user)
     await session.commit()
-    await session.refresh(db_user)
 
     return db_user
 
@@ -63,22 +88,60 @@ async def list_users(
     session: T_Session,
     # current_user: T_CurrentUser,
 ):
-    users = await session.scalars(
-        select(User).offset(filter_users.offset).limit(filter_users.limit)
+    query = paginate(
+        select(User).where(User.deleted_at.is_(None)), User.id, filter_users
     )
 
-    return {'users': users}
+    if settings.FAST_LIST_RESPONSES:
+        rows = await fetch_public_rows(session, query, User, UserPublic)
+        return FastJSONResponse({
+            'users': [row._asdict() for row in rows],
+            'next_cursor': next_cursor(rows, filter_users),
+        })
+
+    users = (await session.scalars(query)).all()
 
+    return {'users': users, 'next_cursor': next_cursor(users, filter_users)}
 
-@router.get('/{user_id}', status_code=HTTPStatus.OK, response_model=UserPublic)
-async def read_user_with_id(user_id: int, session: T_Session):
-    user = await session.scalar(select(User).where(User.id == user_id))
+
+@router.get('/me', status_code=HTTPStatus.OK, response_model=UserWithTodos)
+async def read_current_user_with_todos(
+    session: T_Session, current_user: T_CurrentPrincipal
+):
+    user = await session.scalar(
+        select(User)
+        .options(selectinload(User.todos))
+        .where(User.id == current_user.id)
+    )
+
+    return user
+
+
+@router.get(
+    '/{user_id}',
+    status_code=HTTPStatus.OK,
+    response_model=UserPublic,
+    responses={HTTPStatus.NOT_MODIFIED: {'description': 'Not Modified'}},
+)
+async def read_user_with_id(
+    user_id: int, request: Request, response: Response, session: T_Session
+):
+    user = await session.scalar(
+        select(User).where(User.id == user_id, User.deleted_at.is_(None))
+    )
 
     if not user:
         raise HTTPException(
             status_code=HTTPStatus.NOT_FOUND, detail='User not found!'
         )
 
+    etag = weak_etag(user.id, user.updated_at)
+
+    if etag_matches(request, etag):
+        return not_modified(etag)
+
+    response.headers['ETag'] = etag
+
     return user
 
 
@@ -94,14 +157,18 @@ async def update_user(
             status_code=HTTPStatus.FORBIDDEN, detail='Not enough permissions'
         )
 
+    subject_email = current_user.email
+
     try:
         current_user.username = user.username
-        current_user.password = get_password_hash(user.password)
+        current_user.password = await get_password_hash_async(user.password)
         current_user.email = user.email
+        current_user.token_version += 1
 
         session.add(current_user)
         await session.commit()
-        await session.refresh(current_user)
+        principal_cache.invalidate(subject_email)
+        token_version_cache.invalidate(current_user.id)
 
         return current_user
 
@@ -117,14 +184,35 @@ async def delete_user(
     user_id: int,
     session: T_Session,
     current_user: T_CurrentUser,
+    background_tasks: BackgroundTasks,
 ):
     if current_user.id != user_id:
         raise HTTPException(
             status_code=HTTPStatus.FORBIDDEN, detail='Not enough permissions'
         )
 
-    await session.delete(current_user)
-    await session.commit()
+    stats = await read_todo_stats(session, user_id)
+
+    if stats['total'] <= settings.USER_PURGE_ASYNC_THRESHOLD:
+        # todos go with the user through ON DELETE CASCADE
+        await session.execute(delete(User).where(User.id == user_id))
+        await session.execute(
+            delete(TodoStats).where(TodoStats.user_id == user_id)
+        )
+        await session.execute(
+            delete(TodoVersion).where(TodoVersion.user_id == user_id)
+        )
+        await session.commit()
+    else:
+        current_user.deleted_at = func.now()
+        current_user.token_version += 1
+        await session.commit()
+        background_tasks.add_task(
+            purge_user, session.bind, user_id, settings.USER_PURGE_BATCH_SIZE
+        )
+
+    principal_cache.invalidate(current_user.email)
+    token_version_cache.invalidate(current_user.id)
 
     return Message(message='User deleted!')
     # return {'message': 'User deleted!'}
@@ -1,8 +1,13 @@
 from datetime import datetime
+from typing import Literal
 
-from pydantic import BaseModel, ConfigDict, EmailStr, Field
+from pydantic import BaseModel, ConfigDict, EmailStr, Field, field_validator
 
 from fastapi_zero.models import TodoState
+from fastapi_zero.pagination import decode_cursor, decode_watermark
+from fastapi_zero.settings import get_settings
+
+BULK_MAX_ITEMS = get_settings().TODO_BULK_MAX_ITEMS
 
 
 class Message(BaseModel):
@@ -26,6 +31,7 @@ class UserPublic(BaseModel):
 
 class UserList(BaseModel):
     users: list[UserPublic]
+    next_cursor: str | None = None
 
 
 class TodoSchema(BaseModel):
@@ -42,6 +48,11 @@ class TodoPublic(TodoSchema):
 
 class TodoList(BaseModel):
     todos: list[TodoPublic]
+    next_cursor: str | None = None
+
+
+class UserWithTodos(UserPublic):
+    todos: list[TodoPublic]
 
 
 class TodoUpdate(BaseModel):
@@ -50,6 +61,70 @@ class TodoUpdate(BaseModel):
     state: str | None = None
 
 
+class TodoTombstonePublic(BaseModel):
+    id: int
+    deleted_at: datetime
+
+
+class TodoChanges(BaseModel):
+    todos: list[TodoPublic]
+    deleted: list[TodoTombstonePublic]
+    watermark: str | None = None
+    has_more: bool
+    retry_after: int | None = None
+
+
+class TodoStatsPublic(BaseModel):
+    counts: dict[TodoState, int]
+    total: int
+
+
+class TodoBulkCreate(BaseModel):
+    todos: list[TodoSchema] = Field(max_length=BULK_MAX_ITEMS)
+
+
+class TodoBulkUpdateItem(TodoUpdate):
+    id: int
+    state: TodoState | None = None
+
+    # a missing field is left alone, but none of them can be set to null
+    @field_validator('title', 'description', 'state')
+    @classmethod
+    def reject_null(cls, value):
+        if value is None:
+            raise ValueError('Value cannot be null')
+        return value
+
+
+class TodoBulkUpdate(BaseModel):
+    todos: list[TodoBulkUpdateItem] = Field(max_length=BULK_MAX_ITEMS)
+
+
+class TodoBulkDelete(BaseModel):
+    ids: list[int] = Field(max_length=BULK_MAX_ITEMS)
+
+
+class TodoBulkResult(BaseModel):
+    id: int
+    status: str
+    todo: TodoPublic | None = None
+
+
+class TodoBulkResults(BaseModel):
+    results: list[TodoBulkResult]
+
+
+class TodoImportError(BaseModel):
+    record: int
+    detail: str
+
+
+class TodoImportResult(BaseModel):
+    accepted: int
+    rejected: int
+    errors: list[TodoImportError]
+
+
 class Token(BaseModel):
     access_token: str
     token_type: str
@@ -58,9 +133,52 @@ class Token(BaseModel):
 class FilterPage(BaseModel):
     offset: int = Field(ge=0, default=0)
     limit: int = Field(ge=0, default=10)
+    cursor: str | None = None
+
+    @field_validator('cursor')
+    @classmethod
+    def validate_cursor(cls, value: str | None):
+        if value is not None:
+            decode_cursor(value)
 
+        return value
 
-class FilterTodo(FilterPage):
+
+class TodoFilters(BaseModel):
     title: str | None = Field(default=None, min_length=3, max_length=20)
     description: str | None = None
     state: TodoState | None = None
+    search: str | None = Field(default=None, min_length=3, max_length=100)
+
+
+class FilterTodo(FilterPage, TodoFilters):
+    pass
+
+
+class FilterTodoExport(TodoFilters):
+    format: Literal['ndjson', 'csv'] = 'ndjson'
+
+
+class FilterChanges(BaseModel):
+    since: str | None = None
+    limit: int = Field(ge=1, le=1000, default=100)
+
+    @field_validator('since')
+    @classmethod
+    def validate_since(cls, value: str | None):
+        if value is not None:
+            decode_watermark(value)
+
+        return value
+
+
+class PoolStatistics(BaseModel):
+    pool_class: str
+    checkouts: int
+    timeouts: int
+    wait_seconds_total: float
+    wait_seconds_max: float
+    size: int | None = None
+    checked_in: int | None = None
+    checked_out: int | None = None
+    overflow: int | None = None
@@ -1,32 +1,94 @@
+from dataclasses import dataclass
 from datetime import datetime, timedelta
+from functools import lru_cache
 from http import HTTPStatus
+from time import perf_counter
 from zoneinfo import ZoneInfo
 
+import anyio
 from fastapi import Depends, HTTPException
 from fastapi.security import OAuth2PasswordBearer
 from jwt import DecodeError, ExpiredSignatureError, decode, encode
 from pwdlib import PasswordHash
-from sqlalchemy import select
-from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import exists, select
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
 
-from fastapi_zero.database import get_session
+from fastapi_zero.cache import TTLCache
+from fastapi_zero.database import bind_user, get_session, open_session
+from fastapi_zero.metrics import password_hash_duration
 from fastapi_zero.models import User
-from fastapi_zero.settings import Settings
+from fastapi_zero.settings import get_settings
 
-settings = Settings()
+settings = get_settings()
 
-pwd_context = PasswordHash.recommended()
+password_hash_limiter = anyio.CapacityLimiter(settings.PASSWORD_HASH_WORKERS)
 oauth2_scheme = OAuth2PasswordBearer(
     tokenUrl='auth/token', refreshUrl='auth/refresh'
 )
 
 
+@dataclass(frozen=True, slots=True)
+class Principal:
+    id: int
+    email: str
+    username: str
+    token_version: int = 0
+
+
+principal_cache = TTLCache(
+    maxsize=settings.PRINCIPAL_CACHE_MAXSIZE,
+    ttl=settings.PRINCIPAL_CACHE_TTL_SECONDS,
+)
+token_version_cache = TTLCache(
+    maxsize=settings.PRINCIPAL_CACHE_MAXSIZE,
+    ttl=settings.TOKEN_VERSION_CACHE_TTL_SECONDS,
+)
+
+
+@lru_cache
+def get_password_context():
+    return PasswordHash.recommended()
+
+
 def get_password_hash(password: str):
-    return pwd_context.hash(password)
+    start = perf_counter()
+    hashed = get_password_context().hash(password)
+    password_hash_duration.observe(perf_counter() - start, 'hash')
+
+    return hashed
 
 
 def verify_password(plain_password: str, hashed_password: str):
-    return pwd_context.verify(plain_password, hashed_password)
+    start = perf_counter()
+    verified = get_password_context().verify(plain_password, hashed_password)
+    password_hash_duration.observe(perf_counter() - start, 'verify')
+
+    return verified
+
+
+async def _run_password_hashing(func, *args):
+    statistics = password_hash_limiter.statistics()
+
+    if statistics.tasks_waiting >= settings.PASSWORD_HASH_MAX_PENDING:
+        raise HTTPException(
+            status_code=HTTPStatus.SERVICE_UNAVAILABLE,
+            detail='Too many concurrent password operations',
+            headers={'Retry-After': '1'},
+        )
+
+    return await anyio.to_thread.run_sync(
+        func, *args, limiter=password_hash_limiter
+    )
+
+
+async def get_password_hash_async(password: str):
+    return await _run_password_hashing(get_password_hash, password)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str):
+    return await _run_password_hashing(
+        verify_password, plain_password, hashed_password
+    )
 
 
 def create_access_token(data: dict):
@@ -45,35 +107,148 @@ def create_access_token(data: dict):
     return encoded_jwt
 
 
-async def get_current_user(
-    session: AsyncSession = Depends(get_session),
-    token: str = Depends(oauth2_scheme),
-):
-    credentials_exception = HTTPException(
+def access_token_claims(user: User | Principal):
+    return {
+        'sub': user.email,
+        'uid': user.id,
+        'ver': user.token_version,
+        'name': user.username,
+    }
+
+
+def credentials_exception():
+    return HTTPException(
         status_code=HTTPStatus.UNAUTHORIZED,
         detail='Could not validate credentials',
         headers={'WWW-Authenticate': 'Bearer'},
     )
 
+
+def decode_token(token: str):
     try:
         payload = decode(
             token, settings.SECRET_KEY, algorithms=settings.ALGORITHM
         )
-        subject_email = payload.get('sub')
 
-        if not subject_email:
-            raise credentials_exception
+        if not payload.get('sub'):
+            raise credentials_exception()
 
     except DecodeError:
-        raise credentials_exception
+        raise credentials_exception()
 
     except ExpiredSignatureError:
-        raise credentials_exception
+        raise credentials_exception()
+
+    return payload
+
+
+def stateless_claims(payload: dict):
+    if not settings.STATELESS_TOKENS:
+        return None
+
+    claims = (payload.get('uid'), payload.get('ver'), payload.get('name'))
+    if not isinstance(claims[0], int) or not isinstance(claims[1], int):
+        return None
+
+    if not isinstance(claims[2], str):
+        return None
+
+    return claims
+
+
+async def current_token_version(session: AsyncSession, user_id: int):
+    token_version = token_version_cache.get(user_id)
+    if token_version is not None:
+        return token_version
+
+    token_version = await session.scalar(
+        select(User.token_version).where(
+            User.id == user_id, User.deleted_at.is_(None)
+        )
+    )
+    if token_version is None:
+        raise credentials_exception()
+
+    token_version_cache.set(user_id, token_version)
+
+    return token_version
+
+
+async def still_signed_in(engine: AsyncEngine, principal: Principal):
+    async with open_session(engine) as session:
+        return await session.scalar(
+            select(
+                exists().where(
+                    User.id == principal.id,
+                    User.email == principal.email,
+                    User.token_version == principal.token_version,
+                    User.deleted_at.is_(None),
+                )
+            )
+        )
+
+
+async def get_current_user(
+    session: AsyncSession = Depends(get_session),
+    token: str = Depends(oauth2_scheme),
+):
+    payload = decode_token(token)
+    subject_email = payload['sub']
 
     user = await session.scalar(
-        select(User).where(User.email == subject_email)
+        select(User).where(
+            User.email == subject_email, User.deleted_at.is_(None)
+        )
     )
     if not user:
-        raise credentials_exception
+        raise credentials_exception()
+
+    claims = stateless_claims(payload)
+    if claims and claims[1] != user.token_version:
+        raise credentials_exception()
+
+    principal_cache.set(
+        subject_email,
+        Principal(user.id, user.email, user.username, user.token_version),
+    )
+    await bind_user(session, user.id)
 
     return user
+
+
+async def get_current_principal(
+    session: AsyncSession = Depends(get_session),
+    token: str = Depends(oauth2_scheme),
+):
+    payload = decode_token(token)
+    subject_email = payload['sub']
+
+    claims = stateless_claims(payload)
+    if claims:
+        user_id, token_version, username = claims
+        if await current_token_version(session, user_id) != token_version:
+            raise credentials_exception()
+
+        await bind_user(session, user_id)
+        return Principal(user_id, subject_email, username, token_version)
+
+    principal = principal_cache.get(subject_email)
+    if principal:
+        await bind_user(session, principal.id)
+        return principal
+
+    row = (
+        await session.execute(
+            select(
+                User.id, User.email, User.username, User.token_version
+            ).where(User.email == subject_email, User.deleted_at.is_(None))
+        )
+    ).first()
+    if not row:
+        raise credentials_exception()
+
+    principal = Principal(*row)
+    principal_cache.set(subject_email, principal)
+    await bind_user(session, principal.id)
+
+    return principal
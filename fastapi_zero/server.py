@@ -0,0 +1,39 @@
+import os
+
+import uvicorn
+
+from fastapi_zero.settings import Settings, get_settings
+
+
+def default_workers():
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:  # pragma: no cover
+        cpus = os.cpu_count() or 1
+
+    return cpus
+
+
+def server_options(settings: Settings):
+    return {
+        'host': settings.SERVER_HOST,
+        'port': settings.SERVER_PORT,
+        'workers': settings.SERVER_WORKERS or default_workers(),
+        'loop': 'uvloop',
+        'http': 'httptools',
+        'backlog': settings.SERVER_BACKLOG,
+        'timeout_keep_alive': settings.SERVER_KEEPALIVE_SECONDS,
+        'timeout_graceful_shutdown': settings.SERVER_GRACEFUL_TIMEOUT_SECONDS,
+        'limit_concurrency': settings.SERVER_LIMIT_CONCURRENCY,
+        'limit_max_requests': settings.SERVER_MAX_REQUESTS,
+        'proxy_headers': True,
+        'access_log': settings.SERVER_ACCESS_LOG,
+    }
+
+
+def main():  # pragma: no cover
+    uvicorn.run('fastapi_zero.app:app', **server_options(get_settings()))
+
+
+if __name__ == '__main__':  # pragma: no cover
+    main()
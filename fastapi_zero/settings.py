@@ -1,3 +1,5 @@
+from functools import lru_cache
+
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -10,3 +12,60 @@ class Settings(BaseSettings):
     SECRET_KEY: str
     ALGORITHM: str
     ACCESS_TOKEN_EXPIRE_MINUTES: int
+
+    PRINCIPAL_CACHE_MAXSIZE: int = 1024
+    PRINCIPAL_CACHE_TTL_SECONDS: int = 60
+
+    STATELESS_TOKENS: bool = False
+    TOKEN_VERSION_CACHE_TTL_SECONDS: int = 5
+
+    PASSWORD_HASH_WORKERS: int = 2
+    PASSWORD_HASH_MAX_PENDING: int = 64
+
+    DATABASE_POOL_SIZE: int = 5
+    DATABASE_MAX_OVERFLOW: int = 10
+    DATABASE_POOL_TIMEOUT: float = 30
+    DATABASE_POOL_RECYCLE: int = 1800
+    DATABASE_POOL_PRE_PING: bool = True
+    DATABASE_NULL_POOL: bool = False
+    DATABASE_STATEMENT_TIMEOUT_MS: int = 0
+    DATABASE_PREPARE_THRESHOLD: int | None = 5
+    DATABASE_POOL_WARMUP: int = 0
+    DATABASE_REPLICA_URLS: list[str] = []
+    REPLICA_STICKINESS_SECONDS: float = 5
+
+    TODO_BULK_MAX_ITEMS: int = 5000
+    TODO_EXPORT_BATCH_SIZE: int = 500
+    TODO_IMPORT_BATCH_SIZE: int = 1000
+    TODO_IMPORT_MAX_RECORD_SIZE: int = 1_048_576
+    TODO_TOMBSTONE_RETENTION_DAYS: int = 30
+    TODO_CHANGES_SETTLE_SECONDS: float = 60
+    TODO_STREAM_QUEUE_SIZE: int = 100
+    TODO_STREAM_KEEPALIVE_SECONDS: float = 15
+
+    USER_PURGE_ASYNC_THRESHOLD: int = 10_000
+    USER_PURGE_BATCH_SIZE: int = 1000
+
+    FAST_LIST_RESPONSES: bool = False
+
+    METRICS_ENABLED: bool = True
+
+    QUERY_TRACE_ENABLED: bool = False
+    QUERY_TRACE_MAX_STATEMENTS: int = 10
+    QUERY_TRACE_MAX_DURATION_MS: float = 100
+    QUERY_TRACE_REPEAT_THRESHOLD: int = 3
+
+    SERVER_HOST: str = '0.0.0.0'
+    SERVER_PORT: int = 8000
+    SERVER_WORKERS: int | None = None
+    SERVER_BACKLOG: int = 2048
+    SERVER_KEEPALIVE_SECONDS: int = 5
+    SERVER_GRACEFUL_TIMEOUT_SECONDS: int = 30
+    SERVER_LIMIT_CONCURRENCY: int | None = None
+    SERVER_MAX_REQUESTS: int | None = None
+    SERVER_ACCESS_LOG: bool = True
+
+
+@lru_cache
+def get_settings():
+    return Settings()
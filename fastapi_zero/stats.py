@@ -0,0 +1,84 @@
+import argparse
+import asyncio
+
+from sqlalchemy import delete, func, insert, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from fastapi_zero.database import build_engine
+from fastapi_zero.models import Todo, TodoState, TodoStats, TodoVersion
+from fastapi_zero.settings import get_settings
+
+
+async def read_todo_stats(session: AsyncSession, user_id: int):
+    if session.bind.dialect.name == 'postgresql':
+        query = select(TodoStats.state, TodoStats.count).where(
+            TodoStats.user_id == user_id
+        )
+    else:
+        query = (
+            select(Todo.state, func.count())
+            .where(Todo.user_id == user_id)
+            .group_by(Todo.state)
+        )
+
+    counts = dict.fromkeys(TodoState, 0)
+    counts.update((await session.execute(query)).tuples().all())
+
+    return {
+        'counts': {state.value: count for state, count in counts.items()},
+        'total': sum(counts.values()),
+    }
+
+
+async def read_todo_version(session: AsyncSession, user_id: int):
+    # only the postgres todo_stats trigger maintains todo_versions
+    if session.bind.dialect.name != 'postgresql':
+        raise NotImplementedError('Todo versions require PostgreSQL')
+
+    version = await session.scalar(
+        select(TodoVersion.version).where(TodoVersion.user_id == user_id)
+    )
+
+    return version or 0
+
+
+async def rebuild_todo_stats(
+    session: AsyncSession, user_id: int | None = None
+):
+    todos = select(Todo.user_id, Todo.state, func.count()).group_by(
+        Todo.user_id, Todo.state
+    )
+    stats = delete(TodoStats)
+
+    if user_id is not None:
+        todos = todos.where(Todo.user_id == user_id)
+        stats = stats.where(TodoStats.user_id == user_id)
+
+    # block the triggers until the rebuilt counters are committed
+    await session.execute(text('LOCK TABLE todo_stats IN EXCLUSIVE MODE'))
+    await session.execute(stats)
+    await session.execute(
+        insert(TodoStats).from_select(
+            [TodoStats.user_id, TodoStats.state, TodoStats.count], todos
+        )
+    )
+    await session.commit()
+
+
+async def main(user_id: int | None):
+    engine = build_engine(get_settings())
+
+    async with AsyncSession(engine) as session:
+        await rebuild_todo_stats(session, user_id)
+
+    await engine.dispose()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Rebuild the per-user todo_stats counters from todos.'
+    )
+    parser.add_argument('--user-id', type=int, default=None)
+    args = parser.parse_args()
+
+    asyncio.run(main(args.user_id))
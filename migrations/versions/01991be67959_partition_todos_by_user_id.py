@@ -0,0 +1,80 @@
+"""un-partition point for todos partitioned by the cli
+
+Revision ID: 01991be67959
+Revises: 7212d0cb6c65
+Create Date: 2026-10-18 02:09:07.840060
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# the plain todos table as defined at this revision
+PLAIN_TODOS = [
+    'ALTER SEQUENCE todos_id_seq OWNED BY NONE',
+    'CREATE TABLE todos_rebuilt (LIKE todos INCLUDING DEFAULTS)',
+    'INSERT INTO todos_rebuilt SELECT * FROM todos',
+    'DROP TABLE todos',
+    'ALTER TABLE todos_rebuilt RENAME TO todos',
+    'ALTER TABLE todos ADD CONSTRAINT todos_pkey PRIMARY KEY (id)',
+    'ALTER SEQUENCE todos_id_seq OWNED BY todos.id',
+    'ALTER TABLE todos ADD CONSTRAINT todos_user_id_fkey '
+    'FOREIGN KEY (user_id) REFERENCES users (id)',
+    'CREATE INDEX ix_todos_user_id_id ON todos (user_id, id)',
+    'CREATE INDEX ix_todos_user_id_state_id ON todos (user_id, state, id)',
+    'CREATE INDEX ix_todos_user_id_created_at_id '
+    'ON todos (user_id, created_at, id)',
+    'CREATE INDEX ix_todos_user_id_updated_at_id '
+    'ON todos (user_id, updated_at, id)',
+    'CREATE INDEX ix_todos_search_vector ON todos '
+    "USING gin (to_tsvector('simple', title || ' ' || description))",
+    *(
+        f'CREATE TRIGGER todo_stats_{operation.lower()} '
+        f'AFTER {operation} ON todos {transition_tables} '
+        'FOR EACH STATEMENT EXECUTE FUNCTION todo_stats_apply()'
+        for operation, transition_tables in (
+            ('INSERT', 'REFERENCING NEW TABLE AS new_rows'),
+            ('UPDATE', 'REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows'),
+            ('DELETE', 'REFERENCING OLD TABLE AS old_rows'),
+        )
+    ),
+]
+
+
+# revision identifiers, used by Alembic.
+revision: str = '01991be67959'
+down_revision: Union[str, Sequence[str], None] = '7212d0cb6c65'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema.
+
+    Nothing to do: todos is partitioned with
+    `python -m fastapi_zero.partitioning`, not by a migration.
+    """
+
+
+def downgrade() -> None:
+    """Downgrade schema.
+
+    Rebuild todos as a plain table if it was partitioned, so the
+    revisions below run against the table they were written for.
+    """
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    partitions = op.get_bind().scalar(
+        sa.text(
+            "SELECT count(*) FROM pg_inherits "
+            "WHERE inhparent = 'todos'::regclass"
+        )
+    )
+    if not partitions:
+        return
+
+    for statement in PLAIN_TODOS:
+        op.execute(statement)
@@ -0,0 +1,139 @@
+"""add todo versions changed at
+
+Revision ID: 2304ec024b4b
+Revises: 35826fdba777
+Create Date: 2026-10-18 03:12:43.185797
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# the todo_stats trigger as defined at this revision and the one before
+TODO_STATS_FUNCTION = """
+CREATE OR REPLACE FUNCTION todo_stats_apply() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO todo_stats (user_id, state, count)
+        SELECT user_id, state, count(*) FROM new_rows GROUP BY 1, 2
+        ON CONFLICT (user_id, state)
+        DO UPDATE SET count = todo_stats.count + excluded.count;
+
+        INSERT INTO todo_versions (user_id, version)
+        SELECT DISTINCT user_id, 1 FROM new_rows
+        ON CONFLICT (user_id)
+        DO UPDATE SET version = todo_versions.version + 1, changed_at = now();
+    ELSIF TG_OP = 'UPDATE' THEN
+        INSERT INTO todo_stats (user_id, state, count)
+        SELECT user_id, state, sum(delta) FROM (
+            SELECT user_id, state, 1 AS delta FROM new_rows
+            UNION ALL
+            SELECT user_id, state, -1 AS delta FROM old_rows
+        ) AS deltas
+        GROUP BY 1, 2
+        HAVING sum(delta) <> 0
+        ON CONFLICT (user_id, state)
+        DO UPDATE SET count = todo_stats.count + excluded.count;
+
+        INSERT INTO todo_versions (user_id, version)
+        SELECT user_id, 1 FROM new_rows
+        UNION SELECT user_id, 1 FROM old_rows
+        ON CONFLICT (user_id)
+        DO UPDATE SET version = todo_versions.version + 1, changed_at = now();
+    ELSE
+        UPDATE todo_stats SET count = todo_stats.count - deleted.count
+        FROM (
+            SELECT user_id, state, count(*) AS count
+            FROM old_rows GROUP BY 1, 2
+        ) AS deleted
+        WHERE todo_stats.user_id = deleted.user_id
+            AND todo_stats.state = deleted.state;
+
+        INSERT INTO todo_versions (user_id, version)
+        SELECT DISTINCT user_id, 1 FROM old_rows
+        ON CONFLICT (user_id)
+        DO UPDATE SET version = todo_versions.version + 1, changed_at = now();
+    END IF;
+
+    RETURN NULL;
+END
+$$
+"""
+
+PREVIOUS_TODO_STATS_FUNCTION = """
+CREATE OR REPLACE FUNCTION todo_stats_apply() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO todo_stats (user_id, state, count)
+        SELECT user_id, state, count(*) FROM new_rows GROUP BY 1, 2
+        ON CONFLICT (user_id, state)
+        DO UPDATE SET count = todo_stats.count + excluded.count;
+
+        INSERT INTO todo_versions (user_id, version)
+        SELECT DISTINCT user_id, 1 FROM new_rows
+        ON CONFLICT (user_id)
+        DO UPDATE SET version = todo_versions.version + 1;
+    ELSIF TG_OP = 'UPDATE' THEN
+        INSERT INTO todo_stats (user_id, state, count)
+        SELECT user_id, state, sum(delta) FROM (
+            SELECT user_id, state, 1 AS delta FROM new_rows
+            UNION ALL
+            SELECT user_id, state, -1 AS delta FROM old_rows
+        ) AS deltas
+        GROUP BY 1, 2
+        HAVING sum(delta) <> 0
+        ON CONFLICT (user_id, state)
+        DO UPDATE SET count = todo_stats.count + excluded.count;
+
+        INSERT INTO todo_versions (user_id, version)
+        SELECT user_id, 1 FROM new_rows
+        UNION SELECT user_id, 1 FROM old_rows
+        ON CONFLICT (user_id)
+        DO UPDATE SET version = todo_versions.version + 1;
+    ELSE
+        UPDATE todo_stats SET count = todo_stats.count - deleted.count
+        FROM (
+            SELECT user_id, state, count(*) AS count
+            FROM old_rows GROUP BY 1, 2
+        ) AS deleted
+        WHERE todo_stats.user_id = deleted.user_id
+            AND todo_stats.state = deleted.state;
+
+        INSERT INTO todo_versions (user_id, version)
+        SELECT DISTINCT user_id, 1 FROM old_rows
+        ON CONFLICT (user_id)
+        DO UPDATE SET version = todo_versions.version + 1;
+    END IF;
+
+    RETURN NULL;
+END
+$$
+"""
+
+# revision identifiers, used by Alembic.
+revision: str = '2304ec024b4b'
+down_revision: Union[str, Sequence[str], None] = '35826fdba777'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # ### commands auto generated by Alembic - please adjust! ###
+    op.add_column('todo_versions', sa.Column('changed_at', sa.DateTime(), server_default=sa.text('now()'), nullable=False))
+    # ### end Alembic commands ###
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute(TODO_STATS_FUNCTION)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute(PREVIOUS_TODO_STATS_FUNCTION)
+
+    # ### commands auto generated by Alembic - please adjust! ###
+    op.drop_column('todo_versions', 'changed_at')
+    # ### end Alembic commands ###
@@ -0,0 +1,133 @@
+"""add todo versions table
+
+Revision ID: a398f8389ff6
+Revises: ab2bb1cde650
+Create Date: 2026-10-18 02:51:49.564486
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# the todo_stats trigger as defined at this revision and the one before
+TODO_STATS_FUNCTION = """
+CREATE OR REPLACE FUNCTION todo_stats_apply() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO todo_stats (user_id, state, count)
+        SELECT user_id, state, count(*) FROM new_rows GROUP BY 1, 2
+        ON CONFLICT (user_id, state)
+        DO UPDATE SET count = todo_stats.count + excluded.count;
+
+        INSERT INTO todo_versions (user_id, version)
+        SELECT DISTINCT user_id, 1 FROM new_rows
+        ON CONFLICT (user_id)
+        DO UPDATE SET version = todo_versions.version + 1;
+    ELSIF TG_OP = 'UPDATE' THEN
+        INSERT INTO todo_stats (user_id, state, count)
+        SELECT user_id, state, sum(delta) FROM (
+            SELECT user_id, state, 1 AS delta FROM new_rows
+            UNION ALL
+            SELECT user_id, state, -1 AS delta FROM old_rows
+        ) AS deltas
+        GROUP BY 1, 2
+        HAVING sum(delta) <> 0
+        ON CONFLICT (user_id, state)
+        DO UPDATE SET count = todo_stats.count + excluded.count;
+
+        INSERT INTO todo_versions (user_id, version)
+        SELECT user_id, 1 FROM new_rows
+        UNION SELECT user_id, 1 FROM old_rows
+        ON CONFLICT (user_id)
+        DO UPDATE SET version = todo_versions.version + 1;
+    ELSE
+        UPDATE todo_stats SET count = todo_stats.count - deleted.count
+        FROM (
+            SELECT user_id, state, count(*) AS count
+            FROM old_rows GROUP BY 1, 2
+        ) AS deleted
+        WHERE todo_stats.user_id = deleted.user_id
+            AND todo_stats.state = deleted.state;
+
+        INSERT INTO todo_versions (user_id, version)
+        SELECT DISTINCT user_id, 1 FROM old_rows
+        ON CONFLICT (user_id)
+        DO UPDATE SET version = todo_versions.version + 1;
+    END IF;
+
+    RETURN NULL;
+END
+$$
+"""
+
+PREVIOUS_TODO_STATS_FUNCTION = """
+CREATE OR REPLACE FUNCTION todo_stats_apply() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO todo_stats (user_id, state, count)
+        SELECT user_id, state, count(*) FROM new_rows GROUP BY 1, 2
+        ON CONFLICT (user_id, state)
+        DO UPDATE SET count = todo_stats.count + excluded.count;
+    ELSIF TG_OP = 'UPDATE' THEN
+        INSERT INTO todo_stats (user_id, state, count)
+        SELECT user_id, state, sum(delta) FROM (
+            SELECT user_id, state, 1 AS delta FROM new_rows
+            UNION ALL
+            SELECT user_id, state, -1 AS delta FROM old_rows
+        ) AS deltas
+        GROUP BY 1, 2
+        HAVING sum(delta) <> 0
+        ON CONFLICT (user_id, state)
+        DO UPDATE SET count = todo_stats.count + excluded.count;
+    ELSE
+        UPDATE todo_stats SET count = todo_stats.count - deleted.count
+        FROM (
+            SELECT user_id, state, count(*) AS count
+            FROM old_rows GROUP BY 1, 2
+        ) AS deleted
+        WHERE todo_stats.user_id = deleted.user_id
+            AND todo_stats.state = deleted.state;
+    END IF;
+
+    RETURN NULL;
+END
+$$
+"""
+
+# revision identifiers, used by Alembic.
+revision: str = 'a398f8389ff6'
+down_revision: Union[str, Sequence[str], None] = 'ab2bb1cde650'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # ### commands auto generated by Alembic - please adjust! ###
+    op.create_table('todo_versions',
+    sa.Column('user_id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('user_id')
+    )
+    # ### end Alembic commands ###
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    op.execute(TODO_STATS_FUNCTION)
+    op.execute(
+        'INSERT INTO todo_versions (user_id, version) '
+        'SELECT DISTINCT user_id, 1 FROM todos'
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute(PREVIOUS_TODO_STATS_FUNCTION)
+
+    # ### commands auto generated by Alembic - please adjust! ###
+    op.drop_table('todo_versions')
+    # ### end Alembic commands ###
@@ -0,0 +1,90 @@
+"""add todo change notifications
+
+Revision ID: ab2bb1cde650
+Revises: a5aeb1de033e
+Create Date: 2026-10-18 02:29:47.590895
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# the todo_changes trigger as defined at this revision
+TODO_CHANGES_FUNCTION = """
+CREATE OR REPLACE FUNCTION todo_changes_notify() RETURNS trigger
+LANGUAGE plpgsql AS $$
+DECLARE
+    op text := CASE TG_OP
+        WHEN 'INSERT' THEN 'created'
+        WHEN 'UPDATE' THEN 'updated'
+        ELSE 'deleted'
+    END;
+    changed_rows text := CASE TG_OP
+        WHEN 'DELETE' THEN 'old_rows'
+        ELSE 'new_rows'
+    END;
+    changed bigint;
+BEGIN
+    EXECUTE 'SELECT count(*) FROM ' || quote_ident(changed_rows)
+    INTO changed;
+
+    IF changed > 100 THEN
+        EXECUTE $q$
+            SELECT pg_notify('todo_changes', json_build_object(
+                'user_id', user_id, 'op', 'resync'
+            )::text)
+            FROM $q$ || quote_ident(changed_rows) || ' GROUP BY user_id';
+    ELSE
+        EXECUTE $q$
+            SELECT pg_notify('todo_changes', json_build_object(
+                'user_id', user_id, 'op', $q$ || quote_literal(op) || $q$,
+                'id', id
+            )::text)
+            FROM $q$ || quote_ident(changed_rows) || ' ORDER BY id';
+    END IF;
+
+    RETURN NULL;
+END
+$$
+"""
+
+TODO_CHANGES_TRIGGERS = {
+    'INSERT': 'REFERENCING NEW TABLE AS new_rows',
+    'UPDATE': 'REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows',
+    'DELETE': 'REFERENCING OLD TABLE AS old_rows',
+}
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'ab2bb1cde650'
+down_revision: Union[str, Sequence[str], None] = 'a5aeb1de033e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    op.execute(TODO_CHANGES_FUNCTION)
+    for operation, transition_tables in TODO_CHANGES_TRIGGERS.items():
+        op.execute(
+            f'CREATE TRIGGER todo_changes_{operation.lower()} '
+            f'AFTER {operation} ON todos {transition_tables} '
+            'FOR EACH STATEMENT EXECUTE FUNCTION todo_changes_notify()'
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    for operation in TODO_CHANGES_TRIGGERS:
+        op.execute(
+            f'DROP TRIGGER IF EXISTS todo_changes_{operation.lower()} '
+            'ON todos'
+        )
+    op.execute('DROP FUNCTION IF EXISTS todo_changes_notify()')
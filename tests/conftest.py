@@ -12,7 +12,11 @@ from fastapi_zero.app import app
 from fastapi_zero.database import get_session
 from fastapi_zero.models import Todo, table_registry
 from fastapi_zero.schemas import UserPublic
-from fastapi_zero.security import get_password_hash
+from fastapi_zero.security import (
+    get_password_hash,
+    principal_cache,
+    token_version_cache,
+)
 from fastapi_zero.settings import Settings
 from tests.factories import UserFactory
 
@@ -29,6 +33,13 @@ def client(session):
     app.dependency_overrides.clear()
 
 
+@pytest.fixture(autouse=True)
+def clear_principal_cache():
+    yield
+    principal_cache.clear()
+    token_version_cache.clear()
+
+
 @pytest.fixture(scope='session')
 def engine():
     with PostgresContainer('postgres:17', driver='psycopg') as postgres:
@@ -67,6 +78,29 @@ def mock_db_time():
     return _mock_db_time
 
 
+@contextmanager
+def _count_queries(*, engine):
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(
+        engine.sync_engine, 'before_cursor_execute', before_cursor_execute
+    )
+
+    yield statements
+
+    event.remove(
+        engine.sync_engine, 'before_cursor_execute', before_cursor_execute
+    )
+
+
+@pytest.fixture
+def count_queries(engine):
+    return lambda: _count_queries(engine=engine)
+
+
 @pytest.fixture
 def token(client, user):
     response = client.post(
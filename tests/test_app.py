@@ -1,5 +1,21 @@
+import json
+import subprocess
+import sys
 from http import HTTPStatus
 
+IMPORT_BUDGET_US = 1_500_000
+IMPORT_PROBE = """
+import json, sys
+import fastapi_zero.app
+from fastapi_zero.settings import get_settings
+print(json.dumps({
+    'settings_loads': get_settings.cache_info().misses,
+    'modules': sorted(
+        name for name in ('argon2', 'psycopg') if name in sys.modules
+    ),
+}))
+"""
+
 
 def test_read_root_hello_world(client):
     response = client.get('/')
@@ -22,3 +38,36 @@ def test_read_root_hello_world_html(client):
                 </body>
             </html>"""
     )
+
+
+def test_read_pool_statistics(client):
+    response = client.get('/health/pool')
+
+    assert response.status_code == HTTPStatus.OK
+    assert 'checked_out' in response.json()
+
+
+def _import_times(stderr):
+    times = {}
+
+    for line in stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+
+        _, cumulative, name = line.removeprefix('import time:').split('|')
+        if cumulative.strip().isdigit():
+            times[name.strip()] = int(cumulative)
+
+    return times
+
+
+def test_app_import_stays_lazy():
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', IMPORT_PROBE],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    assert json.loads(result.stdout) == {'settings_loads': 1, 'modules': []}
+    assert _import_times(result.stderr)['fastapi_zero.app'] < IMPORT_BUDGET_US
@@ -99,3 +99,16 @@ def test_token_expired_doesnt_refresh(client, user):
 
         assert response.status_code == HTTPStatus.UNAUTHORIZED
         assert response.json() == {'detail': 'Could not validate credentials'}
+
+
+def test_refresh_access_token_doesnt_load_todos(
+    client, user, todo, token, count_queries
+):
+    with count_queries() as statements:
+        response = client.post(
+            '/auth/refresh', headers={'Authorization': f'Bearer {token}'}
+        )
+
+    assert response.status_code == HTTPStatus.OK
+    assert len(statements) == 1
+    assert 'todos' not in statements[0]
@@ -0,0 +1,55 @@
+from freezegun import freeze_time
+
+from fastapi_zero.cache import TTLCache
+
+
+def test_cache_counts_hits_and_misses():
+    cache = TTLCache(maxsize=2, ttl=60)
+
+    cache.set('a', 1)
+
+    assert cache.get('a') == 1
+    assert cache.get('b') is None
+    assert cache.hits == 1
+    assert cache.misses == 1
+
+
+def test_cache_evicts_least_recently_used():
+    expected_size = 2
+    cache = TTLCache(maxsize=2, ttl=60)
+
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.get('a')
+    cache.set('c', 3)
+
+    assert len(cache) == expected_size
+    assert cache.get('a') == 1
+    assert cache.get('b') is None
+
+
+def test_cache_expires_after_ttl():
+    cache = TTLCache(maxsize=2, ttl=60)
+
+    with freeze_time('2025-12-31 12:00:00') as frozen:
+        cache.set('a', 1)
+        frozen.tick(61)
+
+        assert cache.get('a') is None
+        assert len(cache) == 0
+
+
+def test_cache_invalidate_and_clear():
+    cache = TTLCache(maxsize=2, ttl=60)
+
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.invalidate('a')
+
+    assert cache.get('a') is None
+
+    cache.clear()
+
+    assert len(cache) == 0
+    assert cache.hits == 0
+    assert cache.misses == 0
@@ -0,0 +1,240 @@
+import asyncio
+import json
+import signal
+from contextlib import suppress
+
+import pytest
+from sqlalchemy import select, text
+
+from fastapi_zero.app import app
+from fastapi_zero.changefeed import (
+    CLOSED,
+    RESYNC,
+    ChangeBus,
+    PostgresChangeBus,
+    close_on_shutdown,
+    get_change_bus,
+    stream_changes,
+)
+
+
+@pytest.mark.asyncio
+async def test_change_bus_dispatches_on_commit_to_the_owner(session):
+    bus = ChangeBus(queue_size=10)
+    change = {'user_id': 1, 'op': 'created', 'id': 1}
+
+    async with bus.subscribe(1) as mine, bus.subscribe(2) as theirs:
+        await session.execute(select(1))
+        await bus.publish(session, change)
+        pending = mine.qsize()
+        await session.commit()
+        await session.execute(select(1))
+        await bus.publish(session, {**change, 'id': 2})
+        await session.rollback()
+        await session.commit()
+
+        assert pending == 0
+        assert mine.get_nowait() == change
+        assert mine.empty()
+        assert theirs.empty()
+
+    assert bus.subscribers == {}
+
+
+@pytest.mark.asyncio
+async def test_change_bus_publishes_bulk_writes(client, user, token):
+    headers = {'Authorization': f'Bearer {token}'}
+    bus = ChangeBus(queue_size=10)
+    app.dependency_overrides[get_change_bus] = lambda: bus
+    todo = {'title': 'a', 'description': 'b', 'state': 'todo'}
+
+    async with bus.subscribe(user.id) as queue:
+        client.post(
+            '/todos/bulk', json={'todos': [todo, todo]}, headers=headers
+        )
+        client.request(
+            'DELETE', '/todos/bulk', json={'ids': [2, 1]}, headers=headers
+        )
+        client.post('/todos/import', content=b'', headers=headers)
+
+        changes = [queue.get_nowait() for _ in range(5)]
+
+    assert changes == [
+        {'user_id': user.id, 'op': 'created', 'id': 1},
+        {'user_id': user.id, 'op': 'created', 'id': 2},
+        {'user_id': user.id, 'op': 'deleted', 'id': 1},
+        {'user_id': user.id, 'op': 'deleted', 'id': 2},
+        {'user_id': user.id, **RESYNC},
+    ]
+
+
+@pytest.mark.asyncio
+async def test_change_bus_resyncs_large_writes(session):
+    bus = ChangeBus(queue_size=10)
+
+    async with bus.subscribe(1) as queue:
+        await session.execute(select(1))
+        await bus.publish_many(session, 1, 'updated', range(101))
+        await session.commit()
+
+        assert queue.get_nowait() == {'user_id': 1, **RESYNC}
+        assert queue.empty()
+
+
+@pytest.mark.asyncio
+async def test_change_bus_replaces_backlog_with_resync():
+    bus = ChangeBus(queue_size=2)
+
+    async with bus.subscribe(1) as queue:
+        for todo_id in range(3):
+            bus.dispatch({'user_id': 1, 'op': 'created', 'id': todo_id})
+
+        assert queue.get_nowait() == RESYNC
+        assert queue.empty()
+
+
+@pytest.mark.asyncio
+async def test_stream_changes_emits_server_sent_events():
+    bus = ChangeBus(queue_size=10)
+    stream = stream_changes(bus, 1, keepalive=0.01)
+
+    subscribed = await anext(stream)
+    keepalive = await anext(stream)
+    bus.dispatch({'user_id': 1, 'op': 'deleted', 'id': 7})
+    change = await anext(stream)
+    await bus.close()
+
+    assert subscribed == ': subscribed\n\n'
+    assert keepalive == ': keepalive\n\n'
+    assert change == 'event: todo\ndata: {"op": "deleted", "id": 7}\n\n'
+    with pytest.raises(StopAsyncIteration):
+        await anext(stream)
+
+
+@pytest.mark.asyncio
+async def test_stream_changes_ends_once_no_longer_authorized():
+    bus = ChangeBus(queue_size=10)
+    checks = []
+    expected_checks = 2
+
+    async def authorized():
+        checks.append(True)
+        return len(checks) < expected_checks
+
+    stream = stream_changes(bus, 1, keepalive=0.01, authorized=authorized)
+
+    await anext(stream)
+    keepalive = await anext(stream)
+
+    assert keepalive == ': keepalive\n\n'
+    with pytest.raises(StopAsyncIteration):
+        await anext(stream)
+    assert len(checks) == expected_checks
+    assert not bus.subscribers
+
+
+@pytest.mark.asyncio
+async def test_close_on_shutdown_ends_streams_once_the_server_stops():
+    bus = ChangeBus(queue_size=10)
+    handled = []
+
+    def server_handler(signum, frame):
+        handled.append(signum)
+
+    previous = signal.signal(signal.SIGTERM, server_handler)
+    try:
+        with close_on_shutdown(bus):
+            async with bus.subscribe(1) as queue:
+                signal.raise_signal(signal.SIGTERM)
+                change = await asyncio.wait_for(queue.get(), 1)
+        restored = signal.getsignal(signal.SIGTERM)
+    finally:
+        signal.signal(signal.SIGTERM, previous)
+
+    assert change is CLOSED
+    assert handled == [signal.SIGTERM]
+    assert restored is server_handler
+
+
+@pytest.mark.asyncio
+async def test_postgres_change_bus_relays_todo_writes(
+    engine, client, user, token
+):
+    headers = {'Authorization': f'Bearer {token}'}
+    bus = PostgresChangeBus(engine, queue_size=10)
+    app.dependency_overrides[get_change_bus] = lambda: bus
+
+    try:
+        async with bus.subscribe(user.id) as queue:
+            client.post(
+                '/todos/',
+                json={'title': 'a', 'description': 'b', 'state': 'todo'},
+                headers=headers,
+            )
+            client.patch('/todos/1', json={'title': 'c'}, headers=headers)
+            client.delete('/todos/1', headers=headers)
+
+            changes = [
+                await asyncio.wait_for(queue.get(), timeout=5)
+                for _ in range(3)
+            ]
+    finally:
+        await bus.close()
+
+    assert changes == [
+        {'user_id': user.id, 'op': op, 'id': 1}
+        for op in ('created', 'updated', 'deleted')
+    ]
+
+
+@pytest.mark.asyncio
+async def test_postgres_change_bus_skips_malformed_notifications(engine):
+    bus = PostgresChangeBus(engine, queue_size=10)
+    change = {'user_id': 1, 'op': 'deleted', 'id': 1}
+
+    try:
+        async with bus.subscribe(1) as queue:
+            async with engine.connect() as connection:
+                for payload in ('not json', '[]', '{}', json.dumps(change)):
+                    await connection.execute(
+                        text("SELECT pg_notify('todo_changes', :payload)"),
+                        {'payload': payload},
+                    )
+                await connection.commit()
+
+            received = await asyncio.wait_for(queue.get(), timeout=5)
+            listening = bus.listening.is_set()
+    finally:
+        await bus.close()
+
+    assert received == change
+    assert listening
+
+
+@pytest.mark.asyncio
+async def test_postgres_change_bus_restarts_a_stopped_listener(engine):
+    bus = PostgresChangeBus(engine, queue_size=10)
+    change = {'user_id': 1, 'op': 'deleted', 'id': 1}
+
+    try:
+        async with bus.subscribe(1):
+            bus.listener.cancel()
+            with suppress(asyncio.CancelledError):
+                await bus.listener
+
+        async with bus.subscribe(1) as queue:
+            async with engine.connect() as connection:
+                await connection.execute(
+                    text("SELECT pg_notify('todo_changes', :payload)"),
+                    {'payload': json.dumps(change)},
+                )
+                await connection.commit()
+
+            changes = [
+                await asyncio.wait_for(queue.get(), timeout=5)
+                for _ in range(2)
+            ]
+    finally:
+        await bus.close()
+
+    assert changes == [RESYNC, change]
@@ -0,0 +1,34 @@
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.pool import NullPool
+
+from fastapi_zero.changes import read_todo_changes
+from tests.factories import TodoFactory
+
+
+@pytest.mark.asyncio
+async def test_recent_changes_stay_unsettled_outside_utc(
+    session, engine, user
+):
+    expected_todos = 2
+    settle_seconds = 60
+    local_engine = create_async_engine(
+        engine.url,
+        poolclass=NullPool,
+        connect_args={'options': '-c TimeZone=America/Sao_Paulo'},
+    )
+
+    async with AsyncSession(local_engine) as local_session:
+        local_session.add_all(
+            TodoFactory.create_batch(expected_todos, user_id=user.id)
+        )
+        await local_session.commit()
+
+        changes = await read_todo_changes(
+            local_session, user.id, None, 10, settle_seconds
+        )
+    await local_engine.dispose()
+
+    assert len(changes['todos']) == expected_todos
+    assert changes['watermark'] is None
+    assert 0 < changes['retry_after'] <= settle_seconds
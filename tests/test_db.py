@@ -1,9 +1,28 @@
 from dataclasses import asdict
+from types import SimpleNamespace
 
 import pytest
-from sqlalchemy import select
+import pytest_asyncio
+from fastapi import Request
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.orm import selectinload
+from sqlalchemy.pool import NullPool
 
+from fastapi_zero.database import (
+    MeteredPool,
+    bind_user,
+    build_engine,
+    get_session,
+    open_session,
+    pool_metrics,
+    pool_statistics,
+    read_engine,
+    warm_up_pool,
+)
 from fastapi_zero.models import Todo, User
+from fastapi_zero.settings import get_settings
+from tests.conftest import _count_queries
 
 
 @pytest.mark.asyncio
@@ -17,7 +36,9 @@ async def test_create_user_without_todos(session, mock_db_time):
         await session.commit()
 
         user = await session.scalar(
-            select(User).where(User.username == new_user.username)
+            select(User)
+            .options(selectinload(User.todos))
+            .where(User.username == new_user.username)
         )
 
     assert asdict(user) == {
@@ -25,6 +46,8 @@ async def test_create_user_without_todos(session, mock_db_time):
         'username': 'test',
         'email': 'test@test.com',
         'password': 'secret',
+        'token_version': 0,
+        'deleted_at': None,
         'created_at': time,
         'updated_at': time,
         'todos': [],
@@ -59,7 +82,160 @@ async def test_create_todo(session, mock_db_time, user):
 
 @pytest.mark.asyncio
 async def test_user_todo_relationship(session, user, todo):
-    await session.refresh(user)
-    user = await session.scalar(select(User).where(User.id == user.id))
+    user = await session.scalar(
+        select(User)
+        .options(selectinload(User.todos))
+        .where(User.id == user.id)
+    )
 
     assert user.todos == [todo]
+
+
+def test_build_engine_null_pool(settings):
+    settings.DATABASE_NULL_POOL = True
+
+    null_engine = build_engine(settings)
+
+    assert isinstance(null_engine.pool, NullPool)
+    assert 'size' not in pool_statistics(null_engine)
+
+
+@pytest.mark.asyncio
+async def test_build_engine_pool_settings(engine, settings):
+    settings.DATABASE_URL = engine.url.render_as_string(hide_password=False)
+    settings.DATABASE_POOL_SIZE = 2
+    settings.DATABASE_STATEMENT_TIMEOUT_MS = 1500
+
+    tuned_engine = build_engine(settings)
+    checkouts = pool_metrics.checkouts
+
+    async with tuned_engine.connect() as conn:
+        statement_timeout = await conn.scalar(text('SHOW statement_timeout'))
+        statistics = pool_statistics(tuned_engine)
+
+    await tuned_engine.dispose()
+
+    assert isinstance(tuned_engine.pool, MeteredPool)
+    assert statement_timeout == '1500ms'
+    assert statistics['size'] == settings.DATABASE_POOL_SIZE
+    assert statistics['checked_out'] == 1
+    assert statistics['checkouts'] == checkouts + 1
+
+
+@pytest.mark.asyncio
+async def test_warm_up_pool_opens_connections(engine, settings):
+    settings.DATABASE_URL = engine.url.render_as_string(hide_password=False)
+    settings.DATABASE_POOL_SIZE = 3
+
+    warm_engine = build_engine(settings)
+    await warm_up_pool(warm_engine, settings.DATABASE_POOL_SIZE)
+    statistics = pool_statistics(warm_engine)
+    await warm_engine.dispose()
+
+    assert statistics['checked_in'] == settings.DATABASE_POOL_SIZE
+    assert statistics['checked_out'] == 0
+
+
+@pytest_asyncio.fixture
+async def replica_engine(engine):
+    replica = create_async_engine(engine.url, poolclass=NullPool)
+    yield replica
+    await replica.dispose()
+
+
+@pytest.mark.asyncio
+async def test_read_only_session_sticks_to_one_replica(
+    session, user, engine, replica_engine, count_queries
+):
+    other_replica = create_async_engine(engine.url, poolclass=NullPool)
+    expected_statements = 2
+
+    with (
+        count_queries() as primary_statements,
+        _count_queries(engine=replica_engine) as replica_statements,
+        _count_queries(engine=other_replica) as other_statements,
+    ):
+        async with open_session(
+            engine, [replica_engine, other_replica], read_only=True
+        ) as read_session:
+            found = await read_session.scalar(
+                select(User.email).where(User.id == user.id)
+            )
+            await read_session.scalar(select(User.id))
+    await other_replica.dispose()
+
+    assert found == user.email
+    assert sorted([len(replica_statements), len(other_statements)]) == [
+        0,
+        expected_statements,
+    ]
+    assert not primary_statements
+
+
+@pytest_asyncio.fixture
+async def lagging_replica(engine, user):
+    async with engine.begin() as conn:
+        await conn.execute(text('CREATE SCHEMA lagging'))
+        await conn.execute(
+            text('CREATE TABLE lagging.todos AS SELECT * FROM todos')
+        )
+    replica = create_async_engine(
+        engine.url,
+        poolclass=NullPool,
+        connect_args={'options': '-c search_path=lagging'},
+    )
+    yield replica
+    await replica.dispose()
+    async with engine.begin() as conn:
+        await conn.execute(text('DROP SCHEMA lagging CASCADE'))
+
+
+def _request(method, engine, replica):
+    state = SimpleNamespace(engine=engine, replica_engines=[replica])
+    return Request({
+        'type': 'http',
+        'method': method,
+        'headers': [],
+        'app': SimpleNamespace(state=state),
+    })
+
+
+async def _read_titles(method, user, engine, replica):
+    sessions = get_session(_request(method, engine, replica))
+    read_session = await anext(sessions)
+    await bind_user(read_session, user.id)
+    titles = await read_session.scalars(
+        select(Todo.title).where(Todo.user_id == user.id)
+    )
+    bound = read_engine(read_session)
+    await sessions.aclose()
+    return titles.all(), bound
+
+
+@pytest.mark.asyncio
+async def test_user_reads_own_writes_from_primary(
+    session, user, engine, lagging_replica
+):
+    session.add(Todo('fresh', 'd', 'todo', user.id))
+    await session.commit()
+
+    titles, bound = await _read_titles('GET', user, engine, lagging_replica)
+
+    assert titles == ['fresh']
+    assert bound is engine
+
+
+@pytest.mark.asyncio
+async def test_reads_go_to_lagging_replica_once_stickiness_passes(
+    session, user, engine, lagging_replica, monkeypatch
+):
+    monkeypatch.setattr(get_settings(), 'REPLICA_STICKINESS_SECONDS', 0)
+    session.add(Todo('fresh', 'd', 'todo', user.id))
+    await session.commit()
+
+    titles, bound = await _read_titles('GET', user, engine, lagging_replica)
+    written, _ = await _read_titles('POST', user, engine, lagging_replica)
+
+    assert titles == []
+    assert bound is lagging_replica
+    assert written == ['fresh']
@@ -0,0 +1,84 @@
+import pytest
+
+from fastapi_zero.importer import iter_records
+
+
+async def as_chunks(*chunks):
+    for chunk in chunks:
+        yield chunk
+
+
+async def collect(chunks, csv_format=False, max_size=1000):
+    return [
+        str(record) if isinstance(record, ValueError) else record
+        async for record in iter_records(chunks, csv_format, max_size)
+    ]
+
+
+@pytest.mark.asyncio
+async def test_iter_records_joins_lines_split_across_chunks():
+    records = await collect(as_chunks(b'{"a": 1}\n{"b"', b': 2}\n{"c": 3}'))
+
+    assert records == ['{"a": 1}', '{"b": 2}', '{"c": 3}']
+
+
+@pytest.mark.asyncio
+async def test_iter_records_handles_split_multibyte_characters():
+    text = 'almoçar\n'.encode()
+
+    records = await collect(as_chunks(text[:5], text[5:]))
+
+    assert records == ['almoçar']
+
+
+@pytest.mark.asyncio
+async def test_iter_records_keeps_quoted_csv_newlines():
+    records = await collect(
+        as_chunks(b'a,"line one\r\n', b'line two",b\r\nc,d\r\n'),
+        csv_format=True,
+    )
+
+    assert records == [['a', 'line one\r\nline two', 'b'], ['c', 'd']]
+
+
+@pytest.mark.asyncio
+async def test_iter_records_keeps_stray_csv_quotes_to_their_row():
+    records = await collect(
+        as_chunks(b'Buy 12" pizza,d,todo\r\n', b'a,b,done\r\n'),
+        csv_format=True,
+    )
+
+    assert records == [['Buy 12" pizza', 'd', 'todo'], ['a', 'b', 'done']]
+
+
+@pytest.mark.asyncio
+async def test_iter_records_rejects_oversized_records():
+    records = await collect(
+        as_chunks(b'"open,a\r\n', b'b' * 20, b'\r\n', b'c,d\r\n'),
+        csv_format=True,
+        max_size=10,
+    )
+    lines = await collect(
+        as_chunks(b'{"a": 1}\n', b'x' * 8, b'x' * 8, b'\n{"b": 2}'),
+        max_size=10,
+    )
+
+    assert records == ['Record exceeds 10 characters', ['c', 'd']]
+    assert lines == ['{"a": 1}', 'Record exceeds 10 characters', '{"b": 2}']
+
+
+@pytest.mark.asyncio
+async def test_iter_records_rejects_complete_oversized_lines():
+    long_title = 'x' * 70
+    records = await collect(
+        as_chunks(f'{long_title},d,todo\r\na,b,done\r\n'.encode()),
+        csv_format=True,
+        max_size=10,
+    )
+    lines = await collect(
+        as_chunks(f'{{"title": "{long_title}"}}\n{{"a": 1}}'.encode()),
+        max_size=10,
+    )
+
+    assert records == ['Record exceeds 10 characters', ['a', 'b', 'done']]
+    assert lines == ['Record exceeds 10 characters', '{"a": 1}']
@@ -0,0 +1,79 @@
+from http import HTTPStatus
+
+from fastapi_zero import metrics
+from fastapi_zero.metrics import Counter, Histogram, instrument_engine
+from fastapi_zero.settings import get_settings
+
+
+def _sample(name):
+    for line in metrics.registry.render().splitlines():
+        if line.startswith(name + ' '):
+            return float(line.rsplit(' ', 1)[1])
+
+    return 0.0
+
+
+def test_histogram_renders_cumulative_buckets():
+    histogram = Histogram('latency', 'Latency.', ('route',), buckets=(1, 5))
+
+    for value in (0.5, 1, 3, 10):
+        histogram.observe(value, '/a"b')
+
+    assert histogram.render().splitlines() == [
+        '# HELP latency Latency.',
+        '# TYPE latency histogram',
+        'latency_bucket{route="/a\\"b",le="1"} 2',
+        'latency_bucket{route="/a\\"b",le="5"} 3',
+        'latency_bucket{route="/a\\"b",le="+Inf"} 4',
+        'latency_sum{route="/a\\"b"} 14.5',
+        'latency_count{route="/a\\"b"} 4',
+    ]
+
+
+def test_counter_renders_without_labels():
+    counter = Counter('events_total', 'Events.')
+
+    counter.inc(amount=2)
+
+    assert counter.render().splitlines()[-1] == 'events_total 2'
+
+
+def test_metrics_endpoint_records_requests(client, engine, token):
+    instrument_engine(engine)
+    requests_sample = (
+        'http_requests_total{method="GET",route="/todos/",status="200"}'
+    )
+    statements_sample = (
+        'http_request_db_statements_sum{method="GET",route="/todos/"}'
+    )
+    requests = _sample(requests_sample)
+    statements = _sample(statements_sample)
+
+    client.get('/todos/', headers={'Authorization': f'Bearer {token}'})
+    response = client.get('/metrics')
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.headers['content-type'].startswith('text/plain')
+    assert _sample(requests_sample) == requests + 1
+    assert _sample(statements_sample) > statements
+    assert _sample('password_hash_duration_seconds_count{operation="verify"}')
+    assert 'http_requests_in_progress{method="GET"} 1' in response.text
+
+
+def test_metrics_label_unmatched_routes(client):
+    sample = (
+        'http_requests_total{method="GET",route="<unmatched>",status="404"}'
+    )
+    before = _sample(sample)
+
+    client.get('/does-not-exist')
+
+    assert _sample(sample) == before + 1
+
+
+def test_metrics_endpoint_not_found_when_disabled(client, monkeypatch):
+    monkeypatch.setattr(get_settings(), 'METRICS_ENABLED', False)
+
+    response = client.get('/metrics')
+
+    assert response.status_code == HTTPStatus.NOT_FOUND
@@ -0,0 +1,41 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from fastapi_zero.pagination import (
+    decode_cursor,
+    decode_watermark,
+    encode_cursor,
+    encode_watermark,
+)
+
+
+def test_cursor_roundtrip():
+    expected_id = 42
+
+    assert decode_cursor(encode_cursor(expected_id)) == expected_id
+
+
+@pytest.mark.parametrize('cursor', ['not-a-cursor', 'YWJj', '!!'])
+def test_decode_invalid_cursor(cursor):
+    with pytest.raises(ValueError, match='Invalid cursor'):
+        decode_cursor(cursor)
+
+
+def test_watermark_roundtrip():
+    expected = (datetime(2025, 5, 20, 12, 30, 1, 123456), 42)
+
+    assert decode_watermark(encode_watermark(*expected)) == expected
+
+
+def test_decode_watermark_rejects_aware_times():
+    aware = datetime(2025, 5, 20, 9, 30, tzinfo=timezone(timedelta(hours=-3)))
+
+    with pytest.raises(ValueError, match='Invalid watermark'):
+        decode_watermark(encode_watermark(aware, 42))
+
+
+@pytest.mark.parametrize('watermark', ['not-a-watermark', 'YWJj', 'MXwy'])
+def test_decode_invalid_watermark(watermark):
+    with pytest.raises(ValueError, match='Invalid watermark'):
+        decode_watermark(watermark)
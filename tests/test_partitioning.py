@@ -0,0 +1,84 @@
+from pathlib import Path
+
+import pytest
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import select, text
+
+from fastapi_zero.models import Todo, TodoState
+from fastapi_zero.partitioning import rebuild_todos, todo_partitions
+from fastapi_zero.stats import read_todo_stats
+from tests.factories import TodoFactory
+
+PARTITION_INDEXES = text("""
+    SELECT count(*) FROM pg_indexes WHERE tablename LIKE 'todos_h4_%'
+""")
+
+ALEMBIC_INI = Path(__file__).parent.parent / 'alembic.ini'
+
+
+def _migrate(connection, partitions):
+    config = Config(ALEMBIC_INI)
+    config.attributes.update(connection=connection, configure_logger=False)
+
+    try:
+        command.upgrade(config, 'head')
+        rebuild_todos(connection, partitions)
+        partitioned = todo_partitions(connection)
+        connection.commit()
+
+        command.downgrade(config, 'base')
+        command.upgrade(config, 'head')
+        command.downgrade(config, 'base')
+    finally:
+        connection.rollback()
+        connection.execute(text('DROP TABLE IF EXISTS alembic_version'))
+        connection.commit()
+
+    return partitioned
+
+
+async def _rebuild(session, partitions):
+    await session.run_sync(
+        lambda sync_session: rebuild_todos(
+            sync_session.connection(), partitions
+        )
+    )
+    await session.commit()
+
+    return await session.run_sync(
+        lambda sync_session: todo_partitions(sync_session.connection())
+    )
+
+
+@pytest.mark.asyncio
+async def test_rebuild_todos_partitions_and_back(session, user, other_user):
+    expected_partitions = 4
+    # one primary key index per partition plus the model's indexes
+    expected_indexes = expected_partitions * (len(Todo.__table__.indexes) + 1)
+    session.add_all(TodoFactory.create_batch(3, user_id=user.id))
+    await session.commit()
+
+    partitions = await _rebuild(session, expected_partitions)
+    session.add(TodoFactory(user_id=other_user.id, state=TodoState.done))
+    await session.commit()
+
+    ids = (await session.scalars(select(Todo.id).order_by(Todo.id))).all()
+    stats = await read_todo_stats(session, other_user.id)
+
+    assert partitions == expected_partitions
+    assert await session.scalar(PARTITION_INDEXES) == expected_indexes
+    assert ids == [1, 2, 3, 4]
+    assert stats['counts']['done'] == 1
+    assert await _rebuild(session, 0) == 0
+    assert len((await session.scalars(select(Todo.id))).all()) == len(ids)
+
+
+@pytest.mark.asyncio
+async def test_migrations_round_trip_a_partitioned_database(engine):
+    expected_partitions = 4
+
+    async with engine.connect() as connection:
+        partitions = await connection.run_sync(_migrate, expected_partitions)
+
+    assert partitions == expected_partitions
@@ -0,0 +1,73 @@
+import logging
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import NullPool
+
+from fastapi_zero.querytrace import (
+    QueryTrace,
+    QueryTraceMiddleware,
+    find_problems,
+    instrument_engine,
+)
+
+
+def _traced_client(engine, settings, statements):
+    traced_engine = create_async_engine(engine.url, poolclass=NullPool)
+    instrument_engine(traced_engine)
+    app = FastAPI()
+    app.add_middleware(QueryTraceMiddleware, settings=settings)
+
+    @app.get('/users/{user_id}')
+    async def read(user_id: int):
+        async with traced_engine.connect() as conn:
+            for _ in range(statements):
+                await conn.execute(text('SELECT :id'), {'id': user_id})
+
+        return {}
+
+    return TestClient(app)
+
+
+def test_find_problems_within_budget(settings):
+    trace = QueryTrace([('SELECT 1', 0.001), ('SELECT 2', 0.001)])
+
+    assert find_problems(trace, settings) == []
+
+
+def test_find_problems_flags_budgets_and_repeats(settings):
+    settings.QUERY_TRACE_MAX_STATEMENTS = 2
+    settings.QUERY_TRACE_MAX_DURATION_MS = 10
+    trace = QueryTrace([('SELECT  1\n', 0.005)] * 3)
+
+    problems = find_problems(trace, settings)
+
+    assert problems == [
+        '3 statements exceed the budget of 2',
+        '15.0ms in SQL exceeds the budget of 10ms',
+        'possible N+1: statement ran 3 times: SELECT 1',
+    ]
+
+
+def test_query_trace_sets_server_timing(engine, settings):
+    client = _traced_client(engine, settings, statements=2)
+
+    response = client.get('/users/1')
+
+    assert response.headers['server-timing'].startswith('db;dur=')
+    assert 'desc="2 statements"' in response.headers['server-timing']
+    assert 'querytrace' not in response.headers['server-timing']
+
+
+def test_query_trace_logs_repeated_statements(engine, settings, caplog):
+    client = _traced_client(engine, settings, statements=4)
+
+    with caplog.at_level(logging.WARNING, logger='fastapi_zero.querytrace'):
+        response = client.get('/users/1')
+
+    assert (
+        'querytrace;desc="1 problems"' in (response.headers['server-timing'])
+    )
+    assert 'GET /users/{user_id}: possible N+1' in caplog.text
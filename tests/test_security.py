@@ -4,10 +4,18 @@ import jwt
 import pytest
 from fastapi import HTTPException
 from jwt import decode
+from sqlalchemy import func
 
+from fastapi_zero import security
 from fastapi_zero.security import (
+    Principal,
     create_access_token,
     get_current_user,
+    get_password_hash_async,
+    principal_cache,
+    still_signed_in,
+    token_version_cache,
+    verify_password_async,
 )
 
 
@@ -53,3 +61,168 @@ async def test_jwt_user_not_found_in_db(session, settings):
 
     assert excinfo.value.status_code == HTTPStatus.UNAUTHORIZED
     assert excinfo.value.detail == 'Could not validate credentials'
+
+
+def test_principal_cache_skips_user_lookup(client, user, token, count_queries):
+    client.get('/todos/', headers={'Authorization': f'Bearer {token}'})
+
+    with count_queries() as statements:
+        response = client.get(
+            '/todos/', headers={'Authorization': f'Bearer {token}'}
+        )
+
+    assert response.status_code == HTTPStatus.OK
+    assert not any('FROM users' in statement for statement in statements)
+    assert principal_cache.hits == 1
+    assert principal_cache.get(user.email).id == user.id
+
+
+def test_principal_cache_invalidated_on_update(client, user, token):
+    client.get('/todos/', headers={'Authorization': f'Bearer {token}'})
+
+    client.put(
+        f'/users/{user.id}',
+        json={
+            'username': user.username,
+            'email': 'bob@example.com',
+            'password': user.clean_password,
+        },
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    response = client.get(
+        '/todos/', headers={'Authorization': f'Bearer {token}'}
+    )
+
+    assert response.status_code == HTTPStatus.UNAUTHORIZED
+
+
+def test_principal_cache_invalidated_on_delete(client, user, token):
+    client.get('/todos/', headers={'Authorization': f'Bearer {token}'})
+
+    client.delete(
+        f'/users/{user.id}', headers={'Authorization': f'Bearer {token}'}
+    )
+
+    response = client.get(
+        '/todos/', headers={'Authorization': f'Bearer {token}'}
+    )
+
+    assert response.status_code == HTTPStatus.UNAUTHORIZED
+
+
+def test_stateless_tokens_skip_user_lookup(
+    client, user, token, count_queries, monkeypatch
+):
+    monkeypatch.setattr(security.settings, 'STATELESS_TOKENS', True)
+    client.get('/todos/', headers={'Authorization': f'Bearer {token}'})
+
+    with count_queries() as statements:
+        response = client.get(
+            '/todos/', headers={'Authorization': f'Bearer {token}'}
+        )
+
+    assert response.status_code == HTTPStatus.OK
+    assert not any('FROM users' in statement for statement in statements)
+    assert token_version_cache.get(user.id) == 0
+    assert principal_cache.hits == 0
+
+
+def test_stateless_tokens_revoked_on_password_change(
+    client, user, token, monkeypatch
+):
+    monkeypatch.setattr(security.settings, 'STATELESS_TOKENS', True)
+    client.get('/todos/', headers={'Authorization': f'Bearer {token}'})
+
+    client.put(
+        f'/users/{user.id}',
+        json={
+            'username': user.username,
+            'email': user.email,
+            'password': 'new-password',
+        },
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    response = client.get(
+        '/todos/', headers={'Authorization': f'Bearer {token}'}
+    )
+    new_token = client.post(
+        '/auth/token',
+        data={'username': user.email, 'password': 'new-password'},
+    ).json()['access_token']
+
+    assert response.status_code == HTTPStatus.UNAUTHORIZED
+    assert (
+        client.get(
+            '/todos/', headers={'Authorization': f'Bearer {new_token}'}
+        ).status_code
+        == HTTPStatus.OK
+    )
+
+
+def test_stateless_tokens_revoked_on_delete(client, user, token, monkeypatch):
+    monkeypatch.setattr(security.settings, 'STATELESS_TOKENS', True)
+    client.get('/todos/', headers={'Authorization': f'Bearer {token}'})
+
+    client.delete(
+        f'/users/{user.id}', headers={'Authorization': f'Bearer {token}'}
+    )
+
+    response = client.get(
+        '/todos/', headers={'Authorization': f'Bearer {token}'}
+    )
+
+    assert response.status_code == HTTPStatus.UNAUTHORIZED
+
+
+def test_stateless_tokens_fall_back_for_legacy_claims(
+    client, user, monkeypatch
+):
+    monkeypatch.setattr(security.settings, 'STATELESS_TOKENS', True)
+    token = create_access_token({'sub': user.email})
+
+    response = client.get(
+        '/todos/', headers={'Authorization': f'Bearer {token}'}
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    assert principal_cache.get(user.email).id == user.id
+
+
+@pytest.mark.asyncio
+async def test_password_hashing_async():
+    hashed = await get_password_hash_async('secret')
+
+    assert await verify_password_async('secret', hashed)
+    assert not await verify_password_async('wrong', hashed)
+
+
+@pytest.mark.asyncio
+async def test_password_hashing_rejects_when_saturated(monkeypatch):
+    monkeypatch.setattr(security.settings, 'PASSWORD_HASH_MAX_PENDING', 0)
+
+    with pytest.raises(HTTPException) as excinfo:
+        await get_password_hash_async('secret')
+
+    assert excinfo.value.status_code == HTTPStatus.SERVICE_UNAVAILABLE
+
+
+@pytest.mark.asyncio
+async def test_still_signed_in_until_token_revoked_or_user_deleted(
+    session, engine, user
+):
+    principal = Principal(user.id, user.email, user.username, 0)
+
+    signed_in = await still_signed_in(engine, principal)
+    user.token_version += 1
+    await session.commit()
+    revoked = await still_signed_in(engine, principal)
+    user.token_version -= 1
+    user.deleted_at = func.now()
+    await session.commit()
+    deleted = await still_signed_in(engine, principal)
+
+    assert signed_in
+    assert not revoked
+    assert not deleted
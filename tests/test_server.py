@@ -0,0 +1,19 @@
+from fastapi_zero.server import default_workers, server_options
+
+
+def test_server_options_default_to_one_worker_per_cpu(settings):
+    options = server_options(settings)
+
+    assert options['workers'] == default_workers()
+    assert options['loop'] == 'uvloop'
+    assert options['http'] == 'httptools'
+    assert options['timeout_graceful_shutdown'] == (
+        settings.SERVER_GRACEFUL_TIMEOUT_SECONDS
+    )
+
+
+def test_server_options_use_configured_workers(settings):
+    expected_workers = 3
+    settings.SERVER_WORKERS = expected_workers
+
+    assert server_options(settings)['workers'] == expected_workers
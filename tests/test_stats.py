@@ -0,0 +1,77 @@
+import pytest
+from sqlalchemy import update
+
+from fastapi_zero.models import TodoState, TodoStats
+from fastapi_zero.stats import (
+    read_todo_stats,
+    read_todo_version,
+    rebuild_todo_stats,
+)
+from tests.factories import TodoFactory
+
+
+@pytest.mark.asyncio
+async def test_todo_stats_are_maintained_by_triggers(session, user):
+    expected_todos = 3
+    session.add_all(
+        TodoFactory.create_batch(
+            expected_todos, user_id=user.id, state=TodoState.todo
+        )
+    )
+    await session.commit()
+
+    stats = await read_todo_stats(session, user.id)
+
+    assert stats['counts']['todo'] == expected_todos
+    assert stats['total'] == expected_todos
+
+
+@pytest.mark.asyncio
+async def test_todo_version_moves_on_every_todo_write(
+    session, user, other_user
+):
+    todo = TodoFactory(user_id=user.id)
+    session.add(todo)
+    await session.commit()
+    created = await read_todo_version(session, user.id)
+
+    todo.title = 'renamed'
+    await session.commit()
+    renamed = await read_todo_version(session, user.id)
+
+    await session.delete(todo)
+    await session.commit()
+    deleted = await read_todo_version(session, user.id)
+
+    assert 0 < created < renamed < deleted
+    assert await read_todo_version(session, other_user.id) == 0
+
+
+@pytest.mark.asyncio
+async def test_rebuild_todo_stats_repairs_drifted_counters(
+    session, user, other_user
+):
+    expected_todos = 2
+    drifted_count = 42
+    session.add_all(
+        TodoFactory.create_batch(
+            expected_todos, user_id=user.id, state=TodoState.done
+        )
+    )
+    session.add(TodoFactory(user_id=other_user.id, state=TodoState.draft))
+    await session.commit()
+    await session.execute(update(TodoStats).values(count=drifted_count))
+    await session.commit()
+
+    await rebuild_todo_stats(session, user.id)
+
+    stats = await read_todo_stats(session, user.id)
+    other_stats = await read_todo_stats(session, other_user.id)
+
+    assert stats['counts']['done'] == expected_todos
+    assert stats['total'] == expected_todos
+    assert other_stats['total'] == drifted_count
+
+    await rebuild_todo_stats(session)
+
+    assert (await read_todo_stats(session, other_user.id))['total'] == 1
@@ -1,8 +1,17 @@
+import csv
+import io
+import json
+from datetime import datetime
 from http import HTTPStatus
+from types import SimpleNamespace
 
 import pytest
+from sqlalchemy.dialects import sqlite
 
 from fastapi_zero.models import Todo, TodoState
+from fastapi_zero.pagination import encode_watermark
+from fastapi_zero.routers import todos as todos_router
+from fastapi_zero.routers.todos import search_clause
 from tests.factories import TodoFactory
 
 # @pytest.mark.asyncio
@@ -59,7 +68,8 @@ def test_list_todos(client, user, todo, token):
                 'created_at': (todo.created_at).isoformat(),
                 'updated_at': (todo.updated_at).isoformat(),
             },
-        ]
+        ],
+        'next_cursor': None,
     }
 
 
@@ -204,6 +214,7 @@ async def test_list_todos_should_return_all_expected_fields(
                 'updated_at': (todo.created_at).isoformat(),
             },
         ],
+        'next_cursor': None,
     }
 
 
@@ -271,3 +282,571 @@ async def test_delete_other_user_todo(client, other_user, session, token):
 
     assert response.status_code == HTTPStatus.NOT_FOUND
     assert response.json() == {'detail': 'Task not found.'}
+
+
+def test_list_todos_statement_count(client, user, todo, token, count_queries):
+    expected_statements = 3
+
+    with count_queries() as statements:
+        response = client.get(
+            '/todos/', headers={'Authorization': f'Bearer {token}'}
+        )
+
+    assert response.status_code == HTTPStatus.OK
+    assert len(statements) == expected_statements
+    assert 'todos' not in statements[0]
+
+
+@pytest.mark.asyncio
+async def test_list_todos_cursor_pagination(session, client, user, token):
+    session.add_all(TodoFactory.create_batch(5, user_id=user.id))
+    await session.commit()
+
+    first_page = client.get(
+        '/todos/?limit=2', headers={'Authorization': f'Bearer {token}'}
+    ).json()
+    second_page = client.get(
+        f'/todos/?limit=2&cursor={first_page["next_cursor"]}',
+        headers={'Authorization': f'Bearer {token}'},
+    ).json()
+    last_page = client.get(
+        f'/todos/?limit=2&cursor={second_page["next_cursor"]}',
+        headers={'Authorization': f'Bearer {token}'},
+    ).json()
+
+    assert [todo['id'] for todo in first_page['todos']] == [1, 2]
+    assert [todo['id'] for todo in second_page['todos']] == [3, 4]
+    assert [todo['id'] for todo in last_page['todos']] == [5]
+    assert last_page['next_cursor'] is None
+
+
+def test_list_todos_invalid_cursor(client, token):
+    response = client.get(
+        '/todos/?cursor=not-a-cursor',
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
+
+
+@pytest.mark.asyncio
+async def test_list_todos_search_should_return_2_todos(
+    session, client, user, token
+):
+    expected_todos = 2
+    session.add_all([
+        TodoFactory(user_id=user.id, title='Buy milk', description='today'),
+        TodoFactory(user_id=user.id, title='Groceries', description='milk'),
+        TodoFactory(user_id=user.id, title='Gym', description='leg day'),
+    ])
+    await session.commit()
+
+    response = client.get(
+        '/todos/?search=milk',
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    assert len(response.json()['todos']) == expected_todos
+
+
+def test_search_clause_falls_back_to_like_outside_postgres():
+    session = SimpleNamespace(bind=SimpleNamespace(dialect=sqlite.dialect()))
+
+    clause = search_clause(session, 'milk')
+
+    assert 'lower(todos.title) LIKE' in str(
+        clause.compile(dialect=sqlite.dialect())
+    )
+
+
+def test_todo_writes_use_a_single_statement(
+    client, user, todo, token, count_queries
+):
+    headers = {'Authorization': f'Bearer {token}'}
+    client.get('/todos/', headers=headers)
+
+    with count_queries() as statements:
+        client.post(
+            '/todos/',
+            json={'title': 'a', 'description': 'b', 'state': 'todo'},
+            headers=headers,
+        )
+        client.patch(f'/todos/{todo.id}', json={'title': 'c'}, headers=headers)
+        client.delete(f'/todos/{todo.id}', headers=headers)
+
+    assert [statement.split()[0] for statement in statements] == [
+        'INSERT',
+        'UPDATE',
+        'DELETE',
+    ]
+    assert all('RETURNING' in statement for statement in statements)
+
+
+def test_create_todos_bulk(client, token, count_queries):
+    headers = {'Authorization': f'Bearer {token}'}
+    client.get('/todos/', headers=headers)
+    todos = [
+        {'title': f'todo {i}', 'description': 'bulk', 'state': 'todo'}
+        for i in range(3)
+    ]
+
+    with count_queries() as statements:
+        response = client.post(
+            '/todos/bulk', json={'todos': todos}, headers=headers
+        )
+
+    results = response.json()['results']
+
+    assert response.status_code == HTTPStatus.OK
+    assert len(statements) == 1
+    assert [result['status'] for result in results] == ['created'] * 3
+    assert [result['todo']['title'] for result in results] == [
+        'todo 0',
+        'todo 1',
+        'todo 2',
+    ]
+
+
+def test_create_todos_bulk_too_many_items(client, token, settings):
+    todo = {'title': 'todo', 'description': 'bulk', 'state': 'todo'}
+
+    response = client.post(
+        '/todos/bulk',
+        json={'todos': [todo] * (settings.TODO_BULK_MAX_ITEMS + 1)},
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
+    assert response.json()['detail'][0]['type'] == 'too_long'
+
+
+@pytest.mark.asyncio
+async def test_patch_todos_bulk(session, client, user, other_user, token):
+    session.add_all(TodoFactory.create_batch(2, user_id=user.id))
+    session.add(TodoFactory(user_id=other_user.id))
+    await session.commit()
+
+    response = client.patch(
+        '/todos/bulk',
+        json={
+            'todos': [
+                {'id': 1, 'title': 'first'},
+                {'id': 2, 'state': 'done'},
+                {'id': 3, 'title': 'not mine'},
+            ]
+        },
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    results = response.json()['results']
+
+    assert response.status_code == HTTPStatus.OK
+    assert results[0]['todo']['title'] == 'first'
+    assert results[1]['todo']['state'] == 'done'
+    assert results[2] == {'id': 3, 'status': 'not_found', 'todo': None}
+
+
+@pytest.mark.asyncio
+async def test_patch_todos_bulk_reports_unchanged_items(
+    session, client, user, token
+):
+    session.add(TodoFactory(user_id=user.id))
+    await session.commit()
+
+    response = client.patch(
+        '/todos/bulk',
+        json={'todos': [{'id': 1}]},
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    assert response.json()['results'][0]['status'] == 'unchanged'
+
+
+def test_patch_todos_bulk_invalid_state(client, token):
+    response = client.patch(
+        '/todos/bulk',
+        json={'todos': [{'id': 1, 'state': 'archived'}]},
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
+
+
+@pytest.mark.asyncio
+async def test_patch_todos_bulk_rejects_null_fields(
+    session, client, user, token
+):
+    session.add(TodoFactory(user_id=user.id))
+    await session.commit()
+
+    response = client.patch(
+        '/todos/bulk',
+        json={'todos': [{'id': 1, 'title': None}]},
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
+    assert response.json()['detail'][0]['loc'] == [
+        'body',
+        'todos',
+        0,
+        'title',
+    ]
+
+
+@pytest.mark.asyncio
+async def test_delete_todos_bulk(session, client, user, other_user, token):
+    session.add_all(TodoFactory.create_batch(2, user_id=user.id))
+    session.add(TodoFactory(user_id=other_user.id))
+    await session.commit()
+
+    response = client.request(
+        'DELETE',
+        '/todos/bulk',
+        json={'ids': [1, 2, 3]},
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    assert [result['status'] for result in response.json()['results']] == [
+        'deleted',
+        'deleted',
+        'not_found',
+    ]
+
+
+def test_delete_todos_bulk_too_many_ids(client, token, settings):
+    response = client.request(
+        'DELETE',
+        '/todos/bulk',
+        json={'ids': list(range(settings.TODO_BULK_MAX_ITEMS + 1))},
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
+
+
+@pytest.mark.asyncio
+async def test_export_todos_ndjson(session, client, user, other_user, token):
+    expected_todos = 3
+    session.add_all(
+        TodoFactory.create_batch(3, user_id=user.id, state=TodoState.done)
+    )
+    session.add(TodoFactory(user_id=user.id, state=TodoState.draft))
+    session.add(TodoFactory(user_id=other_user.id, state=TodoState.done))
+    await session.commit()
+
+    response = client.get(
+        '/todos/export?state=done',
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    lines = [json.loads(line) for line in response.text.splitlines()]
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.headers['content-type'] == 'application/x-ndjson'
+    assert len(lines) == expected_todos
+    assert {line['state'] for line in lines} == {'done'}
+
+
+def test_export_todos_csv(client, user, todo, token):
+    response = client.get(
+        '/todos/export?format=csv',
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.headers['content-type'].startswith('text/csv')
+    assert rows == [
+        {
+            'title': todo.title,
+            'description': todo.description,
+            'state': todo.state,
+            'id': str(todo.id),
+            'created_at': todo.created_at.isoformat(),
+            'updated_at': todo.updated_at.isoformat(),
+        }
+    ]
+
+
+def test_import_todos_ndjson(client, user, token, monkeypatch):
+    monkeypatch.setattr(todos_router.settings, 'TODO_IMPORT_BATCH_SIZE', 2)
+    expected_todos = 3
+    expected_rejected = 2
+    lines = [
+        {'title': 'one', 'description': 'a', 'state': 'todo'},
+        {'title': 'two', 'description': 'b', 'state': 'done'},
+        {'title': 'bad', 'description': 'c', 'state': 'unknown'},
+        {'title': 'three', 'description': 'd', 'state': 'draft'},
+    ]
+    body = '\n'.join(json.dumps(line) for line in lines) + '\nnot json\n'
+
+    response = client.post(
+        '/todos/import',
+        content=body.encode(),
+        headers={
+            'Authorization': f'Bearer {token}',
+            'Content-Type': 'application/x-ndjson',
+        },
+    )
+    todos = client.get(
+        '/todos/', headers={'Authorization': f'Bearer {token}'}
+    ).json()['todos']
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.json()['accepted'] == expected_todos
+    assert response.json()['rejected'] == expected_rejected
+    assert [error['record'] for error in response.json()['errors']] == [3, 5]
+    assert [todo['title'] for todo in todos] == ['one', 'two', 'three']
+
+
+def test_import_todos_csv(client, user, token):
+    body = (
+        'title,description,state\r\n'
+        'one,"multi\nline",todo\r\n'
+        'two,"with ""quotes""",done\r\n'
+    )
+
+    response = client.post(
+        '/todos/import?format=csv',
+        content=body.encode(),
+        headers={
+            'Authorization': f'Bearer {token}',
+            'Content-Type': 'text/csv',
+        },
+    )
+    todos = client.get(
+        '/todos/', headers={'Authorization': f'Bearer {token}'}
+    ).json()['todos']
+
+    assert response.json() == {'accepted': 2, 'rejected': 0, 'errors': []}
+    assert [todo['description'] for todo in todos] == [
+        'multi\nline',
+        'with "quotes"',
+    ]
+
+
+def test_import_todos_csv_invalid_header(client, token, monkeypatch):
+    monkeypatch.setattr(
+        todos_router.settings, 'TODO_IMPORT_MAX_RECORD_SIZE', 10
+    )
+
+    response = client.post(
+        '/todos/import?format=csv',
+        content=b'title,description,state\r\none,two,todo\r\n',
+        headers={
+            'Authorization': f'Bearer {token}',
+            'Content-Type': 'text/csv',
+        },
+    )
+
+    assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
+    assert response.json() == {
+        'detail': 'Invalid CSV header: Record exceeds 10 characters'
+    }
+
+
+@pytest.mark.asyncio
+async def test_list_todos_fast_path_matches_default(
+    session, client, user, token, monkeypatch
+):
+    session.add_all(TodoFactory.create_batch(3, user_id=user.id))
+    await session.commit()
+    url = '/todos/?limit=2'
+    headers = {'Authorization': f'Bearer {token}'}
+
+    default = client.get(url, headers=headers)
+    monkeypatch.setattr(todos_router.settings, 'FAST_LIST_RESPONSES', True)
+    fast = client.get(url, headers=headers)
+
+    assert fast.status_code == HTTPStatus.OK
+    assert fast.json() == default.json()
+
+
+def test_list_todos_not_modified(client, user, todo, token, count_queries):
+    headers = {'Authorization': f'Bearer {token}'}
+    response = client.get('/todos/', headers=headers)
+    etag = response.headers['ETag']
+
+    with count_queries() as statements:
+        not_modified = client.get(
+            '/todos/', headers={**headers, 'If-None-Match': etag}
+        )
+
+    assert etag.startswith('W/')
+    assert not_modified.status_code == HTTPStatus.NOT_MODIFIED
+    assert not_modified.headers['ETag'] == etag
+    assert not not_modified.content
+    assert len(statements) == 1
+    assert 'todo_versions' in statements[0]
+
+
+def test_list_todos_etag_changes_after_write(client, user, todo, token):
+    headers = {'Authorization': f'Bearer {token}'}
+    etag = client.get('/todos/', headers=headers).headers['ETag']
+
+    client.delete(f'/todos/{todo.id}', headers=headers)
+    response = client.get(
+        '/todos/', headers={**headers, 'If-None-Match': etag}
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.headers['ETag'] != etag
+
+
+def test_list_todos_etag_depends_on_query(client, user, todo, token):
+    headers = {'Authorization': f'Bearer {token}'}
+    etag = client.get('/todos/', headers=headers).headers['ETag']
+
+    response = client.get(
+        '/todos/?state=done', headers={**headers, 'If-None-Match': etag}
+    )
+
+    assert response.status_code == HTTPStatus.OK
+
+
+def test_todo_stats_follow_writes(client, user, other_user, token):
+    headers = {'Authorization': f'Bearer {token}'}
+    client.post(
+        '/todos/bulk',
+        json={
+            'todos': [
+                {'title': 'a', 'description': 'a', 'state': 'todo'},
+                {'title': 'b', 'description': 'b', 'state': 'todo'},
+                {'title': 'c', 'description': 'c', 'state': 'doing'},
+            ]
+        },
+        headers=headers,
+    )
+    client.post(
+        '/todos/import',
+        content=b'{"title": "d", "description": "d", "state": "draft"}\n',
+        headers=headers,
+    )
+    client.patch('/todos/1', json={'state': 'done'}, headers=headers)
+    client.delete('/todos/3', headers=headers)
+
+    response = client.get('/todos/stats', headers=headers)
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.json() == {
+        'counts': {
+            'draft': 1,
+            'todo': 1,
+            'doing': 0,
+            'done': 1,
+            'trash': 0,
+        },
+        'total': 3,
+    }
+
+
+def test_list_todo_changes_since_watermark(client, user, token, monkeypatch):
+    monkeypatch.setattr(
+        todos_router.settings, 'TODO_CHANGES_SETTLE_SECONDS', 0
+    )
+    headers = {'Authorization': f'Bearer {token}'}
+    client.post(
+        '/todos/bulk',
+        json={
+            'todos': [
+                {'title': 'a', 'description': 'a', 'state': 'todo'},
+                {'title': 'b', 'description': 'b', 'state': 'todo'},
+                {'title': 'c', 'description': 'c', 'state': 'doing'},
+            ]
+        },
+        headers=headers,
+    )
+
+    first_sync = client.get('/todos/changes', headers=headers).json()
+    client.patch('/todos/1', json={'state': 'done'}, headers=headers)
+    client.delete('/todos/3', headers=headers)
+    second_sync = client.get(
+        '/todos/changes',
+        params={'since': first_sync['watermark']},
+        headers=headers,
+    ).json()
+    third_sync = client.get(
+        '/todos/changes',
+        params={'since': second_sync['watermark']},
+        headers=headers,
+    ).json()
+
+    assert [todo['id'] for todo in first_sync['todos']] == [1, 2, 3]
+    assert first_sync['deleted'] == []
+    assert [todo['id'] for todo in second_sync['todos']] == [1]
+    assert second_sync['todos'][0]['state'] == 'done'
+    assert [tombstone['id'] for tombstone in second_sync['deleted']] == [3]
+    assert third_sync == {
+        'todos': [],
+        'deleted': [],
+        'watermark': second_sync['watermark'],
+        'has_more': False,
+        'retry_after': None,
+    }
+
+
+@pytest.mark.asyncio
+async def test_list_todo_changes_pages_with_limit(
+    session, client, user, token, monkeypatch
+):
+    monkeypatch.setattr(
+        todos_router.settings, 'TODO_CHANGES_SETTLE_SECONDS', 0
+    )
+    headers = {'Authorization': f'Bearer {token}'}
+    session.add_all(TodoFactory.create_batch(3, user_id=user.id))
+    await session.commit()
+
+    first_page = client.get(
+        '/todos/changes', params={'limit': 2}, headers=headers
+    ).json()
+    second_page = client.get(
+        '/todos/changes',
+        params={'limit': 2, 'since': first_page['watermark']},
+        headers=headers,
+    ).json()
+
+    assert [todo['id'] for todo in first_page['todos']] == [1, 2]
+    assert first_page['has_more'] is True
+    assert [todo['id'] for todo in second_page['todos']] == [3]
+    assert second_page['has_more'] is False
+
+
+@pytest.mark.asyncio
+async def test_list_todo_changes_holds_watermark_behind_recent_changes(
+    session, client, user, token
+):
+    headers = {'Authorization': f'Bearer {token}'}
+    session.add_all(TodoFactory.create_batch(3, user_id=user.id))
+    await session.commit()
+
+    changes = client.get(
+        '/todos/changes', params={'limit': 2}, headers=headers
+    ).json()
+
+    assert [todo['id'] for todo in changes['todos']] == [1, 2]
+    assert changes['watermark'] is None
+    assert changes['has_more'] is True
+    assert changes['retry_after'] > 0
+
+
+def test_list_todo_changes_expired_watermark(client, token):
+    response = client.get(
+        '/todos/changes',
+        params={'since': encode_watermark(datetime(2000, 1, 1), 0)},
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    assert response.status_code == HTTPStatus.GONE
+
+
+def test_list_todo_changes_invalid_watermark(client, token):
+    response = client.get(
+        '/todos/changes',
+        params={'since': 'not-a-watermark'},
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
@@ -1,7 +1,12 @@
 from http import HTTPStatus
 
-from fastapi_zero.models import User
+import pytest
+from sqlalchemy import func, select
+
+from fastapi_zero.models import Todo, TodoTombstone, User
+from fastapi_zero.routers import users as users_router
 from fastapi_zero.schemas import UserPublic
+from tests.factories import TodoFactory
 
 
 def test_create_user(client, mock_db_time):
@@ -68,7 +73,7 @@ def test_list_users(client, user, token, mock_db_time):
         )
 
     assert response.status_code == HTTPStatus.OK
-    assert response.json() == {'users': [user_schema]}
+    assert response.json() == {'users': [user_schema], 'next_cursor': None}
 
 
 def test_read_user_with_id(client, user, mock_db_time):
@@ -155,6 +160,45 @@ def test_delete_user(client, user, token):
     assert response.json() == {'message': 'User deleted!'}
 
 
+@pytest.mark.asyncio
+async def test_delete_user_cascades_todos_in_the_database(
+    session, client, user, token, count_queries
+):
+    session.add_all(TodoFactory.create_batch(3, user_id=user.id))
+    await session.commit()
+
+    with count_queries() as statements:
+        response = client.delete(
+            f'/users/{user.id}', headers={'Authorization': f'Bearer {token}'}
+        )
+
+    assert response.status_code == HTTPStatus.OK
+    assert not [s for s in statements if s.startswith('DELETE FROM todos')]
+    assert await session.scalar(select(func.count()).select_from(Todo)) == 0
+    assert not await session.scalar(select(func.count(TodoTombstone.id)))
+
+
+@pytest.mark.asyncio
+async def test_delete_large_user_purges_in_background(
+    session, client, user, token, monkeypatch
+):
+    session.add_all(TodoFactory.create_batch(5, user_id=user.id))
+    await session.commit()
+    monkeypatch.setattr(users_router.settings, 'USER_PURGE_ASYNC_THRESHOLD', 1)
+    monkeypatch.setattr(users_router.settings, 'USER_PURGE_BATCH_SIZE', 2)
+
+    response = client.delete(
+        f'/users/{user.id}', headers={'Authorization': f'Bearer {token}'}
+    )
+    me = client.get('/users/me', headers={'Authorization': f'Bearer {token}'})
+
+    assert response.status_code == HTTPStatus.OK
+    assert me.status_code == HTTPStatus.UNAUTHORIZED
+    assert await session.scalar(select(func.count()).select_from(Todo)) == 0
+    assert await session.scalar(select(func.count()).select_from(User)) == 0
+    assert not await session.scalar(select(func.count(TodoTombstone.id)))
+
+
 def test_delete_returns_not_enough_permissions(client, other_user, token):
     response = client.delete(
         f'/users/{other_user.id}', headers={'Authorization': f'Bearer {token}'}
@@ -162,3 +206,83 @@ def test_delete_returns_not_enough_permissions(client, other_user, token):
 
     assert response.status_code == HTTPStatus.FORBIDDEN
     assert response.json() == {'detail': 'Not enough permissions'}
+
+
+def test_read_current_user_with_todos(client, user, todo, token):
+    response = client.get(
+        '/users/me', headers={'Authorization': f'Bearer {token}'}
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.json()['id'] == user.id
+    assert response.json()['todos'] == [
+        {
+            'id': todo.id,
+            'title': todo.title,
+            'description': todo.description,
+            'state': todo.state,
+            'created_at': (todo.created_at).isoformat(),
+            'updated_at': (todo.updated_at).isoformat(),
+        }
+    ]
+
+
+def test_list_users_doesnt_load_todos(
+    client, user, todo, token, count_queries
+):
+    with count_queries() as statements:
+        response = client.get('/users/')
+
+    assert response.status_code == HTTPStatus.OK
+    assert len(statements) == 1
+    assert 'todos' not in statements[0]
+
+
+def test_list_users_cursor_pagination(client, user, other_user):
+    first_page = client.get('/users/?limit=1').json()
+    second_page = client.get(
+        f'/users/?limit=1&cursor={first_page["next_cursor"]}'
+    ).json()
+
+    assert first_page['users'][0]['id'] == user.id
+    assert second_page['users'][0]['id'] == other_user.id
+
+
+def test_create_user_doesnt_refresh(client, count_queries):
+    with count_queries() as statements:
+        client.post(
+            '/users/',
+            json={
+                'username': 'alice',
+                'email': 'alice@example.com',
+                'password': 'secret',
+            },
+        )
+
+    assert [statement.split()[0] for statement in statements] == [
+        'SELECT',
+        'INSERT',
+    ]
+    assert 'RETURNING' in statements[1]
+
+
+def test_list_users_fast_path_matches_default(
+    client, user, other_user, monkeypatch
+):
+    default = client.get('/users/?limit=1')
+    monkeypatch.setattr(users_router.settings, 'FAST_LIST_RESPONSES', True)
+    fast = client.get('/users/?limit=1')
+
+    assert fast.status_code == HTTPStatus.OK
+    assert fast.json() == default.json()
+
+
+def test_read_user_with_id_not_modified(client, user):
+    etag = client.get(f'/users/{user.id}').headers['ETag']
+
+    response = client.get(
+        f'/users/{user.id}', headers={'If-None-Match': f'"x", {etag}'}
+    )
+
+    assert response.status_code == HTTPStatus.NOT_MODIFIED
+    assert response.headers['ETag'] == etag